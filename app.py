@@ -10,43 +10,26 @@ import streamlit as st
 
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import sys
-import matplotlib.pyplot as plt
-import re
-import nltk
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('vader_lexicon')
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import os
+import shutil
+import tempfile
+import time
 np.set_printoptions(precision=2, linewidth=80)
 
-from sklearn import metrics
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.linear_model import SGDClassifier
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.ensemble import RandomForestClassifier
-
 
 import warnings 
 warnings.filterwarnings('ignore')
 
-######################### functions clean text
-
-stop_words = nltk.corpus.stopwords.words('english')
-
-def normalize_document(doc):
-    doc = re.sub(r'[^a-zA-Z0-9\s]', '', doc, re.I|re.A)
-    doc = doc.lower()
-    doc = doc.strip()
-    tokens = nltk.word_tokenize(doc)
-    filtered_tokens = [token for token in tokens if token not in stop_words] 
-    doc = ' '.join(filtered_tokens)
-    return doc
-  
-normalize_corpus = np.vectorize(normalize_document)
+# Heavy modules (sklearn, matplotlib, TextBlob, NLTK data) are imported or
+# fetched inside the task that needs them, so the Home page renders without them.
+from sentiment_analyzer.charts import available_backends as available_chart_backends
+from sentiment_analyzer.export import available_formats, export_file_name, export_mime
+from sentiment_analyzer.ingest import count_column_values, stream_stage, write_stream
+from sentiment_analyzer.instrument import finish_run, stage as timed, start_run
+from sentiment_analyzer.scoring import (CLEAN_COLUMNS, CLEAN_SENTIMENT_COLUMNS, SENTIMENT_COLUMNS, TEXTBLOB_COLUMNS,
+                                        VADER_COLUMNS, clean_chunk, clean_sentiment_chunk, sentiment_chunk,
+                                        textblob_chunk, vader_chunk)
+from sentiment_analyzer.startup import CLEAN_RESOURCES, VADER_RESOURCES, ensure_nltk_resources
 
 
 ########################## df to csv and download generator custome functions:
@@ -61,571 +44,545 @@ def generate_download_button(csv_data, filename, file_label):
                            file_name=f"{filename}.csv")
 
 
-######################### custome functions TextBlob
-
-from textblob import TextBlob
-
-def polarity(txt):
+DEFAULT_EXPORT_FORMAT = 'csv.gz'
+
+
+def run_streaming_task(csv_file, stage, usecols, filename, count_column=None, index_text_column=None):
+    # Streams the upload through `stage` chunk by chunk into a temporary file so the full
+    # input and output DataFrames never sit in memory together; compressed and columnar
+    # formats also keep the bytes handed to the download button small.
+    # With index_text_column the scored rows also go into a sentiment index (see
+    # sentiment_analyzer/corpus_index.py) kept with the export, so the reruns triggered by
+    # exploring the results reopen both instead of scoring the upload again.
+    # Returns (value counts of count_column, index or None).
+    # st.download_button copies the whole file into Streamlit's in-memory media store, so
+    # the default is compressed: plain csv puts the full output in memory once more.
+    formats = available_formats()
+    fmt = st.selectbox('Download format', formats, index=formats.index(DEFAULT_EXPORT_FORMAT),
+                       key=f'format_{filename}',
+                       help='The file offered for download is held in server memory; '
+                            'csv.gz, csv.zst and parquet are several times smaller than csv.')
+    index = builder = out_path = None
+    if index_text_column is not None:
+        import hashlib
+        from sentiment_analyzer.corpus_index import IndexBuilder, index_dir, open_index
+        index_name = f'{filename}-{hashlib.blake2b(csv_file.getvalue(), digest_size=10).hexdigest()}'
+        out_path = os.path.join(index_dir(index_name), 'export' + export_file_name('', fmt))
+        index = open_index(index_name)
+        if index is not None and os.path.exists(out_path):
+            st.write(index.frame(range(min(5, index.n_rows))))
+            with open(out_path, 'rb') as f:
+                st.download_button(label=f"Download {filename} as {fmt}", data=f,
+                                   file_name=export_file_name(filename, fmt), mime=export_mime(fmt))
+            counts = index.label_counts(count_column) if count_column in index.label_columns else None
+            return counts, index
+        builder = IndexBuilder(index_dir(index_name), index_text_column)
+
+    progress_bar = st.progress(0)
+    status = st.empty()
+
+    def report(rows_done, fraction):
+        if fraction is not None:
+            progress_bar.progress(fraction)
+        status.write(f'Processed {rows_done} rows')
+
+    def indexed(chunks):
+        for chunk in chunks:
+            with timed('index', rows=len(chunk)):
+                builder.add(chunk)
+            yield chunk
+
+    fd, tmp_path = tempfile.mkstemp(suffix=export_file_name('', fmt))
+    os.close(fd)
     try:
-        return TextBlob(txt).sentiment.polarity
-    except:
-        return None
-
-def subjectivity(txt):
-  try:
-      return TextBlob(txt).sentiment.subjectivity
-  except:
-        return None
-
-def analyze(x):
-        if x < 0:
-            return 'negative'
-        elif x == 0:
-            return 'neutral'
-        else:
-            return 'positive'
-
-
-###################################################################### Functions for sentiment VADER analysis:
-
-analyzer = SentimentIntensityAnalyzer()
-
-def vader_sentiment(txt):
-  try:
-      return analyzer.polarity_scores(txt)['compound']
-  except:
-      return None
+        chunks = stream_stage(csv_file, stage, usecols=usecols, progress=report)
+        if builder is not None:
+            chunks = indexed(chunks)
+        head, counts, n_rows = write_stream(chunks, tmp_path, fmt=fmt, count_column=count_column)
+        progress_bar.progress(1.0)
+        if builder is not None:
+            with timed('index', rows=0):
+                index = builder.finish(source=csv_file.name)
+            shutil.move(tmp_path, out_path)  # the temp dir may be on another filesystem
+            tmp_path = out_path
+        st.write(head)
+        with open(tmp_path, 'rb') as f:
+            st.download_button(label=f"Download {filename} as {fmt}",
+                               data=f,
+                               file_name=export_file_name(filename, fmt),
+                               mime=export_mime(fmt))
+    finally:
+        if tmp_path != out_path:
+            os.remove(tmp_path)
+    return counts, index
+
+
+def explore_index(index, label_column):
+    # Filters run against the memory-mapped index: no rescoring, milliseconds per query.
+    key = os.path.basename(index.path)
+    with st.expander('Explore the scored reviews', expanded=True):
+        words = st.text_input('Reviews mentioning (all of these words)', key=f'{key}_words')
+        labels = st.multiselect(label_column, index.categories(label_column), key=f'{key}_labels')
+        score_column = st.selectbox('Score', index.score_columns, key=f'{key}_score') if index.score_columns else None
+        score_ranges = {}
+        if score_column is not None:
+            low, high = (-1.0, 1.0) if score_column in ('polarity', 'compound') else (0.0, 1.0)
+            selected = st.slider(f'{score_column} range', low, high, (low, high), step=0.01, key=f'{key}_range')
+            if selected != (low, high):
+                score_ranges[score_column] = selected
+
+        start = time.perf_counter()
+        rows = index.filter(labels={label_column: labels} if labels else None,
+                            contains=words.split() or None, score_ranges=score_ranges)
+        # unfiltered counts and histograms were precomputed when the index was built
+        subset = rows if labels or words.split() or score_ranges else None
+        label_counts = index.label_counts(label_column, subset)
+        st.write(f'{len(rows)} of {index.n_rows} reviews match ({(time.perf_counter() - start) * 1000:.1f} ms)')
+        display_bar_chart(label_counts)
+        if score_column is not None:
+            counts, edges = index.histogram(score_column, subset)
+            display_histogram(counts, edges, score_column)
+            if subset is None:
+                st.write(index.quantiles(score_column))
+        st.dataframe(index.frame(rows, limit=200))
+
+
+def require_nltk_resources(names):
+    # Without the data the scorers fail (or VADER scores nothing), so stop the task with
+    # a message instead of showing empty results.
+    missing = [name for name, available in ensure_nltk_resources(names).items() if not available]
+    if missing:
+        st.error(f"NLTK data not available: {', '.join(missing)}. Run "
+                 f"`python -m nltk.downloader {' '.join(missing)}` on the server and reload.")
+        st.stop()
+
+
+######################### custome functions TextBlob and VADER (see sentiment_analyzer/scoring.py)
+
+from sentiment_analyzer.scoring import polarity, analyze
+
+
+def display_value_counts(x):
+  st.write(x)
+  display_bar_chart(x)
+
+
+def display_bar_chart(counts):
+  # Drawn once from the aggregated counts; see sentiment_analyzer/charts.py
+  with timed('plot', rows=len(counts)):
+    if chart_backend == 'native':
+      st.bar_chart(counts)
+    else:
+      from sentiment_analyzer.charts import bar_png
+      st.image(bar_png(counts.index, counts.to_numpy(), xlabel=counts.name))
 
 
-def vader_analysis(sentiment, neg_threshold=-0.05, pos_threshold=0.05):
-    if sentiment < neg_threshold:
-        label = 'negative'
-    elif sentiment > pos_threshold:
-        label = 'positive'
+def display_histogram(counts, edges, column):
+  with timed('plot', rows=int(np.sum(counts))):
+    if chart_backend == 'native':
+      st.bar_chart(pd.Series(counts, index=np.round(edges[:-1], 2), name=column))
     else:
-        label = 'neutral'
-    return label
+      from sentiment_analyzer.charts import histogram_png
+      st.image(histogram_png(counts, edges, xlabel=column))
 
 
 #################################################### functions Supervised Learning
 
-def get_metrics(true_labels, predicted_labels):
-  st.write('Accuracy:', np.round(metrics.accuracy_score(true_labels, predicted_labels), 4))
-  st.write('Precision:',np.round(metrics.precision_score(true_labels, predicted_labels, average = 'weighted'), 4))
-  st.write('Recall:',np.round(metrics.recall_score(true_labels, predicted_labels, average = 'weighted'), 4))
-  st.write('F1 Score:',np.round(metrics.f1_score(true_labels, predicted_labels, average = 'weighted'), 4))
-
-def train_predict_model(classifier, 
-                        train_features, train_labels, 
-                        test_features, test_labels):   
-    classifier.fit(train_features, train_labels)
-    predictions = classifier.predict(test_features) 
-    return predictions   
-
-
-# custom function
-
-def classification_report(true_labels, predicted_labels, classes=[1,0], output_dict=True):
-  report = metrics.classification_report(y_true=true_labels, y_pred = predicted_labels, labels = classes, output_dict=True)
-  return(report)
+def get_metrics(matrix):
+  scores = matrix.scores()
+  st.write('Accuracy:', np.round(scores['accuracy'], 4))
+  st.write('Precision:',np.round(scores['precision'], 4))
+  st.write('Recall:',np.round(scores['recall'], 4))
+  st.write('F1 Score:',np.round(scores['f1'], 4))
 
-def display_confusion_matrix(true_labels, predicted_labels, classes=[1,0]):
-    
-    total_classes = len(classes)
-    level_labels = [total_classes*[0], list(range(total_classes))]
-
-    cm = metrics.confusion_matrix(y_true=true_labels, y_pred=predicted_labels, 
-                                  labels=classes)
-    cm_frame = pd.DataFrame(data=cm, 
-                            columns=pd.MultiIndex(levels=[['Predicted:'], classes], 
-                                                  codes=level_labels), 
-                            index=pd.MultiIndex(levels=[['Actual:'], classes], 
-                                                codes=level_labels)) 
-    st.write(cm_frame) 
+def display_confusion_matrix(matrix, classes=[1,0]):
+    st.write(matrix.frame(classes))
     
 
-def display_model_performance_metrics(true_labels, predicted_labels, classes=[1,0]):
+def display_model_performance_metrics(true_labels, predicted_labels, classes=[1,0], matrix=None):
+  # Every number below comes from one confusion matrix (sentiment_analyzer/metrics.py).
+  from sentiment_analyzer.metrics import confusion_matrix
+  with timed('metrics', rows=len(true_labels)):
+    if matrix is None:
+      matrix = confusion_matrix(true_labels, predicted_labels, classes)
     st.write('Model Performance metrics:')
-    get_metrics(true_labels=true_labels, predicted_labels=predicted_labels)
+    get_metrics(matrix)
     st.write('\n')
     st.write('Prediction Confusion Matrix:')
-    display_confusion_matrix(true_labels=true_labels, predicted_labels=predicted_labels, 
-                             classes=classes)
-
-
-
-
-#################################################### main app.py
-
-st.title('Welcome - Sentiment Analyzer')
-st.subheader('Supervised and Unsupervised Learning')
-
-menu = ['Home','About']
-choice = st.sidebar.selectbox('Menu', menu)
-
-if choice == 'Home':
-  st.subheader('Welcome to the Sentiment Analyzer Streamlit Application')
-
-  sentence = st.text_input('Try the TextBlob sentiment analyzer in a sentence.')
-  analysis = TextBlob(sentence)
-  analysis = analysis.sentiment
-  sent_sentence = polarity(sentence)
-  sent_sentence = analyze(sent_sentence)
-  st.write('The polarity and subjectivity of your sentence is', {analysis})
-  st.write('Here is the sentiment of your sentence:', {sent_sentence})
-  st.write('\n')
-  st.write('NOTE: If the polarity score is > 0 it means your sentence has a positive sentiment. If the polarity score is < 0 it means it has a negative sentiment (Try typing: I hate you). If the polarity score equals 0 its a neutral sentiment.')
-  task = st.selectbox('Select analysis type', ['Inspect CSV','Clean Text' ,'TextBlob', 'VADER', 'Logistic Regression', 'Support Vector Machine', 'Gradient Boosting Classifier', 'Random Forest Classifier'])
-  if task == 'Inspect CSV':
-      st.header('Natural Language Processing')
-      st.subheader('Inspecting your csv file with sentiment column')
-
-      st.write(f'Please upload or drag and drop your csv file.')
-      #with st.expander('Value Counts and Bar Graph'):
-      csv_file = st.file_uploader('Upload File - Insepct')
-
-      if csv_file:
-
-        df = pd.read_csv(csv_file)
-        x = df['sentiment'].value_counts()
-        barplot = sns.barplot(x.index,x)
-        st.write(x)
-        fig = plt.figure(figsize = (14,5))
-        sns.barplot(x.index,x)
-        st.pyplot(fig)
-
-  if task == 'Clean Text':
-      st.header('Natural Language Processing: Text Cleaner')
-      st.subheader('Preprocessing your Data')
-      st.write('Please upload or drag and drop your csv file to initiate the preprocessing step.')
-      st.write('\n')
-      st.write('This Text-Cleaner is useful for the TextBlob and VADER Sentiment Analyzers.')
-      csv_file = st.file_uploader('Upload File - Preprocessing')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df[df.Review.str.strip() == ''].shape[0]
-        norm_corpus = normalize_corpus(df['Review'])
-        df['Clean Review'] = norm_corpus
-        df = df[['Review', 'Clean Review']]
-
-        df.replace(r'^(\s?)+$', np.nan, regex=True)
-        df.dropna().reset_index(drop=True)
-
-        df['Clean Review'] = norm_corpus
-        df = df[['Review', 'Clean Review']]
-        st.write(df.head())
-
-        csv = convert_df(df)
-        generate_download_button(csv_data=csv, filename='clean', file_label='clean')
-
-      
-      st.write('This Text-Cleaner is useful for the Logistic Regression and Support Vector Machine Analyzers.')
-      st.write('Why? Unlike the Unsupervised Models we have (TextBlob and VADER), which calculate 3 sentiments, our Unsupervised Models only calculate 2 sentiments -> positive and negative.')
-      csv_file = st.file_uploader('Upload File - Preprocessing(sentiment column)')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df[df.Review.str.strip() == ''].shape[0]
-        norm_corpus = normalize_corpus(df['Review'])
-        df['Clean Review'] = norm_corpus
-        df = df[['Review', 'Clean Review', 'sentiment']]
-
-        df.replace(r'^(\s?)+$', np.nan, regex=True)
-        df.dropna().reset_index(drop=True)
-
-        df['Clean Review'] = norm_corpus
-        df = df[['Clean Review', 'sentiment']]
-        st.write(df.head())
-
-        csv = convert_df(df)
-        generate_download_button(csv_data=csv, filename='clean_with_sentiment', file_label='clean_with_sentiment')
-
-  if task == 'TextBlob':
-      st.subheader('TextBlob Lexicon Model')
-      st.write(f'Please upload or drag and drop your clean preprocess data.')
-      csv_file = st.file_uploader("Upload File (TextBlob Sentiment)")
-
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df['polarity'] = df['Clean Review'].apply(polarity)
-        df['subjectivity'] = df['Clean Review'].apply(subjectivity)
-        df['sentiment'] = df['polarity'].apply(analyze)
-        df = df[['Clean Review', 'polarity', 'subjectivity', 'sentiment']]
-        st.write(df.head())
-
-        csv = convert_df(df)
-        generate_download_button(csv_data=csv, filename='textblob_analysis', file_label='textblob_analysis')
-
-        x = df['sentiment'].value_counts()
-        barplot = sns.barplot(x.index,x)
-        st.write(x)
-        fig = plt.figure(figsize = (14,5))
-        sns.barplot(x.index,x)
-        st.pyplot(fig)
-
-
-
-  if task == 'VADER':
-      st.subheader('VADER Lexicon Model')
-      st.write('Please upload or drag and drop your data.')
-      st.write('VADER does not require preprocess data. It even takes on emojies!')
-      csv_file = st.file_uploader("Upload File")
-
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df['compound'] = df['Review'].apply(vader_sentiment)
-        df['sentiment'] = df['compound'].apply(vader_analysis)
-        df = df[['Review', 'compound', 'sentiment']]
-        st.write(df.head())
-
-        csv = convert_df(df)
-        generate_download_button(csv_data=csv, filename='vader_analysis', file_label='vader_analysis')
-
-        x = df['sentiment'].value_counts()
-        barplot = sns.barplot(x.index,x)
-        st.write(x)
-        fig = plt.figure(figsize = (14,5))
-        sns.barplot(x.index,x)
-        st.pyplot(fig)
-
-
-
-  if task == 'Support Vector Machine': 
-      st.subheader('Supervised Learning: Support Vector Machine')
-      st.write('Please upload or drag and drop your csv file.')
-      csv_file = st.file_uploader('Upload File - SVM (TF-IDF Model)')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df = df[['Clean Review', 'sentiment']].fillna('')
-        reviews = np.array(df['Clean Review'])
-        sentiments = np.array(df['sentiment'])
-
-        train_reviews = reviews[:35000]
-        train_sentiments = sentiments[:35000]
-        test_reviews = reviews[35000:]
-        test_sentiments = sentiments[35000:]
-
-        norm_train_reviews = normalize_corpus(train_reviews)
-        norm_test_reviews = normalize_corpus(test_reviews)
-
-        tv = TfidfVectorizer(use_idf=True, min_df=0.0, max_df=1.0, ngram_range=(1,2), sublinear_tf=True)
-        tv_train_features = tv.fit_transform(norm_train_reviews)
-
-        tv_test_features = tv.transform(norm_test_reviews)
-
-        st.write('TFIDF model:> Train features shape:', tv_train_features.shape, ' Test features shape:', tv_test_features.shape)
-
-        svm = SGDClassifier(loss='hinge', max_iter=100)
-
-        svm_tfidf_predictions = train_predict_model(classifier=svm, train_features=tv_train_features, train_labels=train_sentiments, test_features=tv_test_features, test_labels=test_sentiments)
-
-        display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=svm_tfidf_predictions, classes=['positive', 'negative'])
-
-        classification_rep_tfidf = classification_report(true_labels=test_sentiments, predicted_labels=svm_tfidf_predictions, classes=['positive', 'negative'], output_dict = True)
-
-        df_tfidf = pd.DataFrame(classification_rep_tfidf).transpose()
-        df_tfidf.at['accuracy', 'precision'] = 0.0
-        df_tfidf.at['accuracy', 'recall'] = 0.0
-
-        st.write(df_tfidf)
-        csv = convert_df(df_tfidf)
-        generate_download_button(csv_data=csv, filename='svm_tfidf', file_label='svm_tfidf')
-
-
-
-      csv_file = st.file_uploader('Upload File - SVM (BOW Model)')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df = df[['Clean Review', 'sentiment']].fillna('')
-        reviews = np.array(df['Clean Review'])
-        sentiments = np.array(df['sentiment'])
-
-        train_reviews = reviews[:35000]
-        train_sentiments = sentiments[:35000]
-        test_reviews = reviews[35000:]
-        test_sentiments = sentiments[35000:]
-
-        norm_train_reviews = normalize_corpus(train_reviews)
-        norm_test_reviews = normalize_corpus(test_reviews)
-
-        cv = CountVectorizer(binary=False, min_df=0.0, max_df=1.0, ngram_range=(1,2))
-
-        cv_train_features = cv.fit_transform(norm_train_reviews)
-        cv_test_features = cv.transform(norm_test_reviews)
-
-        print('BOW model:> Train features shape:', cv_train_features.shape, ' Test features shape:', cv_test_features.shape)
+    display_confusion_matrix(matrix, classes=classes)
 
-        svm = SGDClassifier(loss='hinge', max_iter=100)
 
-        svm_bow_predictions = train_predict_model(classifier=svm, train_features=cv_train_features, train_labels=train_sentiments, test_features=cv_test_features, test_labels=test_sentiments)
+def run_job(kind, csv_file, **params):
+    # Long fits run on the shared background job queue (sentiment_analyzer/jobs.py). The
+    # script only polls: a widget change reruns app.py, re-submits the same upload and
+    # attaches to the job that is already running (or its saved result) instead of
+    # starting over, and other sessions submitting the same file share it too.
+    import queue
+    from sentiment_analyzer.jobs import FAILED, get_default_queue
 
-        display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=svm_bow_predictions, classes=['positive', 'negative'])
-
-        classification_rep_bow = classification_report(true_labels=test_sentiments, predicted_labels=svm_bow_predictions, classes=['positive', 'negative'], output_dict = True)
-
-        df_bow = pd.DataFrame(classification_rep_bow).transpose()
-        df_bow.at['accuracy', 'precision'] = 0.0
-        df_bow.at['accuracy', 'recall'] = 0.0
-
-        st.write(df_bow)
-        csv = convert_df(df_bow)
-        generate_download_button(csv_data=csv, filename='svm_bow', file_label='svm_bow')
-
-
-  if task == 'Logistic Regression':
-      st.subheader('Supervised Learning: Logistic Regression')
-      st.write('Please upload or drag and drop your csv file.')
-      csv_file = st.file_uploader('Upload File  - Logistic Regression (TF-IDF Model)')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df = df[['Clean Review', 'sentiment']].fillna('')
-        reviews = np.array(df['Clean Review'])
-        sentiments = np.array(df['sentiment'])
-
-        train_reviews = reviews[:35000]
-        train_sentiments = sentiments[:35000]
-        test_reviews = reviews[35000:]
-        test_sentiments = sentiments[35000:]
-
-        norm_train_reviews = normalize_corpus(train_reviews)
-        norm_test_reviews = normalize_corpus(test_reviews)
-
-        tv = TfidfVectorizer(use_idf=True, min_df=0.0, max_df=1.0, ngram_range=(1,2), sublinear_tf=True)
-        tv_train_features = tv.fit_transform(norm_train_reviews)
-
-        tv_test_features = tv.transform(norm_test_reviews)
-
-        st.write('TFIDF model:> Train features shape:', tv_train_features.shape, ' Test features shape:', tv_test_features.shape)
-
-        lr = LogisticRegression(penalty='l2', max_iter=500, C=1)
-
-        lr_tfidf_predictions = train_predict_model(classifier=lr, train_features=tv_train_features, train_labels=train_sentiments,test_features=tv_test_features, test_labels=test_sentiments)
-
-        display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=lr_tfidf_predictions, classes=['positive', 'negative'])
-
-        classification_rep_tfidf = classification_report(true_labels=test_sentiments, predicted_labels=lr_tfidf_predictions, classes=['positive', 'negative'], output_dict = True)
-
-        df_tfidf = pd.DataFrame(classification_rep_tfidf).transpose()
-        df_tfidf.at['accuracy', 'precision'] = 0.0
-        df_tfidf.at['accuracy', 'recall'] = 0.0
-
-        st.write(df_tfidf)
-        csv = convert_df(df_tfidf)
-        generate_download_button(csv_data=csv, filename='lr_tfidf', file_label='lr_tfidf')
-
-
-
-
-      csv_file = st.file_uploader('Upload File - Logistic Regression (BOW Model)')
-      if csv_file:
-        df = pd.read_csv(csv_file)
-        df = df[['Clean Review', 'sentiment']].fillna('')
-        reviews = np.array(df['Clean Review'])
-        sentiments = np.array(df['sentiment'])
-
-        train_reviews = reviews[:35000]
-        train_sentiments = sentiments[:35000]
-        test_reviews = reviews[35000:]
-        test_sentiments = sentiments[35000:]
-
-        norm_train_reviews = normalize_corpus(train_reviews)
-        norm_test_reviews = normalize_corpus(test_reviews)
-
-        cv = CountVectorizer(binary=False, min_df=0.0, max_df=1.0, ngram_range=(1,2))
-        cv_train_features = cv.fit_transform(norm_train_reviews)
-
-        cv_test_features = cv.transform(norm_test_reviews)
-
-        st.write('BOW model:> Train features shape:', cv_train_features.shape, ' Test features shape:', cv_test_features.shape)
-
-        lr = LogisticRegression(penalty='l2', max_iter=500, C=1)
-
-        lr_bow_predictions = train_predict_model(classifier=lr, train_features=cv_train_features, train_labels=train_sentiments,test_features=cv_test_features, test_labels=test_sentiments)
-
-        display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=lr_bow_predictions, classes=['positive', 'negative'])
-
-        classification_rep_bow = classification_report(true_labels=test_sentiments, predicted_labels=lr_bow_predictions, classes=['positive', 'negative'])
-
-        df_bow = pd.DataFrame(classification_rep_bow).transpose()
-        df_bow.at['accuracy', 'precision'] = 0.0
-        df_bow.at['accuracy', 'recall'] = 0.0
-
-        st.write(df_bow)
-        csv = convert_df(df_bow)
-        generate_download_button(csv_data=csv, filename='lr_bow', file_label='lr_bow')
-
-  if task == 'Gradient Boosting Classifier':
-        st.subheader('Supervised Learning: GradientBoost Classifier')
-        st.write('Please upload or drag and drop your csv file.')
-        csv_file = st.file_uploader('Upload File  - GradientBoost Classifier (TF-IDF Model)')
-        if csv_file:
-          df = pd.read_csv(csv_file)
-          df = df[['Clean Review', 'sentiment']].fillna('')
-          reviews = np.array(df['Clean Review'])
-          sentiments = np.array(df['sentiment'])
-
-          train_reviews = reviews[:35000]
-          train_sentiments = sentiments[:35000]
-          test_reviews = reviews[35000:]
-          test_sentiments = sentiments[35000:]
-
-          norm_train_reviews = normalize_corpus(train_reviews)
-          norm_test_reviews = normalize_corpus(test_reviews)
-
-          tv = TfidfVectorizer(use_idf=True, min_df=0.0, max_df=1.0, ngram_range=(1,2), sublinear_tf=True)
-          tv_train_features = tv.fit_transform(norm_train_reviews)
-
-          tv_test_features = tv.transform(norm_test_reviews)
-
-          st.write('TFIDF model:> Train features shape:', tv_train_features.shape, ' Test features shape:', tv_test_features.shape)
-
-          gbc = GradientBoostingClassifier(n_estimators=10, random_state=42)
-
-          gbc_tfidf_predictions = train_predict_model(classifier=gbc, train_features=tv_train_features, train_labels=train_sentiments, test_features=tv_test_features, test_labels=test_sentiments)
-
-          display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=gbc_tfidf_predictions, classes=['positive', 'negative'])
-
-          classification_rep_tfidf = classification_report(true_labels=test_sentiments, predicted_labels=gbc_tfidf_predictions, classes=['positive', 'negative'], output_dict = True)
-       
-          df_tfidf = pd.DataFrame(classification_rep_tfidf).transpose()
-          df_tfidf.at['accuracy', 'precision'] = 0.0
-          df_tfidf.at['accuracy', 'recall'] = 0.0
-
-          st.write(df_tfidf)
-          csv = convert_df(df_tfidf)
-          generate_download_button(csv_data=csv, filename='gbc_tfidf', file_label='gbc_tfidf')
-
-
-
-
-        csv_file = st.file_uploader('Upload File - GradientBoost Classifier (BOW Model)')
-        if csv_file:
-          df = pd.read_csv(csv_file)
-          df = df[['Clean Review', 'sentiment']].fillna('')
-          reviews = np.array(df['Clean Review'])
-          sentiments = np.array(df['sentiment'])
-
-          train_reviews = reviews[:35000]
-          train_sentiments = sentiments[:35000]
-          test_reviews = reviews[35000:]
-          test_sentiments = sentiments[35000:]
-
-          norm_train_reviews = normalize_corpus(train_reviews)
-          norm_test_reviews = normalize_corpus(test_reviews)
-
-          cv = CountVectorizer(binary=False, min_df=0.0, max_df=1.0, ngram_range=(1,2))
-          cv_train_features = cv.fit_transform(norm_train_reviews)
-
-          cv_test_features = cv.transform(norm_test_reviews)
-
-          st.write('BOW model:> Train features shape:', cv_train_features.shape, ' Test features shape:', cv_test_features.shape)
-
-          gbc = GradientBoostingClassifier(n_estimators=10, random_state=42)
-
-          gbc_bow_predictions = train_predict_model(classifier=gbc, train_features=cv_train_features, train_labels=train_sentiments,test_features=cv_test_features, test_labels=test_sentiments)
-
-          display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=gbc_bow_predictions, classes=['positive', 'negative'])
-
-          classification_rep_bow = classification_report(true_labels=test_sentiments, predicted_labels=gbc_bow_predictions, classes=['positive', 'negative'])
-
-          df_bow = pd.DataFrame(classification_rep_bow).transpose()
-          df_bow.at['accuracy', 'precision'] = 0.0
-          df_bow.at['accuracy', 'recall'] = 0.0
-
-          st.write(df_bow)
-          csv = convert_df(df_bow)
-          generate_download_button(csv_data=csv, filename='gbc_bow', file_label='gbc_bow')
-
-
-  if task == 'Random Forest Classifier':
-        st.subheader('Supervised Learning: RandomForest Classifier')
-        st.write('Please upload or drag and drop your csv file.')
-        csv_file = st.file_uploader('Upload File  - RandomForest Classifier (TF-IDF Model)')
-        if csv_file:
-          df = pd.read_csv(csv_file)
-          df = df[['Clean Review', 'sentiment']].fillna('')
-          reviews = np.array(df['Clean Review'])
-          sentiments = np.array(df['sentiment'])
-
-          train_reviews = reviews[:35000]
-          train_sentiments = sentiments[:35000]
-          test_reviews = reviews[35000:]
-          test_sentiments = sentiments[35000:]
+    try:
+        job = get_default_queue().submit(kind, csv_file.getvalue(), **params)
+    except queue.Full as exc:
+        st.warning(f'The server is busy: {exc}')
+        return None
+    if not job.done:
+        status = st.empty()
+        progress_bar = st.progress(0.0)
+        while not job.done:
+            progress_bar.progress(job.progress)
+            status.write(f'Job {job.id[:8]} {job.state}: {job.message}')
+            time.sleep(0.5)
+        progress_bar.empty()
+        status.empty()
+    if job.state == FAILED:
+        st.error(f'Job {job.id[:8]} failed: {job.error}')
+        return None
+    return job.result()
 
-          norm_train_reviews = normalize_corpus(train_reviews)
-          norm_test_reviews = normalize_corpus(test_reviews)
 
-          tv = TfidfVectorizer(use_idf=True, min_df=0.0, max_df=1.0, ngram_range=(1,2), sublinear_tf=True)
-          tv_train_features = tv.fit_transform(norm_train_reviews)
+def run_supervised_model(csv_file, vectorizer_name, classifier_name, filename, compact=False, split='head'):
+    from sentiment_analyzer.models import VECTORIZER_TITLES
 
-          tv_test_features = tv.transform(norm_test_reviews)
+    if compact:
+        vectorizer_name = f'{vectorizer_name}-compact'
 
-          st.write('TFIDF model:> Train features shape:', tv_train_features.shape, ' Test features shape:', tv_test_features.shape)
-          
-          rfc = RandomForestClassifier(n_estimators=10, random_state=42)
-          
-          rfc_tfidf_predictions = train_predict_model(classifier=rfc, train_features=tv_train_features, train_labels=train_sentiments, test_features=tv_test_features, test_labels=test_sentiments)
+    # fitted pairs are persisted, so re-running the same upload skips training
+    result = run_job('train', csv_file, vectorizer_name=vectorizer_name, classifier_name=classifier_name, split=split)
+    if result is None:
+        return
+    if result['from_cache']:
+        st.write('Loaded previously trained model for this data.')
 
-          display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=rfc_tfidf_predictions, classes=['positive', 'negative'])
+    st.write(f'{VECTORIZER_TITLES[vectorizer_name]} model:> Train features shape:', result['train_shape'],
+             ' Test features shape:', result['test_shape'])
 
-          classification_rep_tfidf = classification_report(true_labels=test_sentiments, predicted_labels=rfc_tfidf_predictions, classes=['positive', 'negative'], output_dict = True)
-       
-          df_tfidf = pd.DataFrame(classification_rep_tfidf).transpose()
-          df_tfidf.at['accuracy', 'precision'] = 0.0
-          df_tfidf.at['accuracy', 'recall'] = 0.0
+    display_model_performance_metrics(true_labels=result['test_labels'], predicted_labels=result['predictions'], classes=['positive', 'negative'],
+                                      matrix=result.get('confusion'))
 
-          st.write(df_tfidf)
-          csv = convert_df(df_tfidf)
-          generate_download_button(csv_data=csv, filename='rfc_tfidf', file_label='rfc_tfidf')
+    df_report = result['report']
 
+    st.write(df_report)
+    csv = convert_df(df_report)
+    generate_download_button(csv_data=csv, filename=filename, file_label=filename)
 
 
 
-        csv_file = st.file_uploader('Upload File - RandomForest Classifier (BOW Model)')
-        if csv_file:
-          df = pd.read_csv(csv_file)
-          df = df[['Clean Review', 'sentiment']].fillna('')
-          reviews = np.array(df['Clean Review'])
-          sentiments = np.array(df['sentiment'])
 
-          train_reviews = reviews[:35000]
-          train_sentiments = sentiments[:35000]
-          test_reviews = reviews[35000:]
-          test_sentiments = sentiments[35000:]
+def compare_fast_ensemble(task, classifier_name, split):
+    from sentiment_analyzer.models import FAST_ENSEMBLES
 
-          norm_train_reviews = normalize_corpus(train_reviews)
-          norm_test_reviews = normalize_corpus(test_reviews)
+    st.write('Fast ensemble: chi2 feature selection in front of a multi-core ensemble, timed against the current model on the same TF-IDF features.')
+    csv_file = st.file_uploader(f'Upload File - {task} (fast vs current)')
+    if csv_file:
+        df_compare = run_job('compare', csv_file, split=split, vectorizer_names=['tfidf'],
+                             classifier_names=[classifier_name, FAST_ENSEMBLES[classifier_name]])
+        if df_compare is not None:
+            st.write(df_compare)
 
-          cv = CountVectorizer(binary=False, min_df=0.0, max_df=1.0, ngram_range=(1,2))
-          cv_train_features = cv.fit_transform(norm_train_reviews)
 
-          cv_test_features = cv.transform(norm_test_reviews)
 
-          st.write('BOW model:> Train features shape:', cv_train_features.shape, ' Test features shape:', cv_test_features.shape)
 
-          rfc = RandomForestClassifier(n_estimators=10, random_state=42)
+def display_run_timings(trace):
+    # Sidebar breakdown of where this rerun spent its time; nested stages are indented
+    # and already included in their parent's seconds.
+    st.sidebar.subheader(f'Run timings ({trace.seconds:.2f}s)')
+    rows = []
+    for record in trace.records.values():
+        rows.append({'stage': '\u2003' * record.depth + record.name.rsplit('/', 1)[-1],
+                     'seconds': round(record.seconds, 3),
+                     'rows': record.rows,
+                     'rows/s': round(record.rows / record.seconds) if record.rows and record.seconds else None,
+                     'RSS +MiB': round(record.rss_delta / 2 ** 20, 1)})
+    st.sidebar.dataframe(pd.DataFrame(rows).set_index('stage'))
+    st.sidebar.download_button('Timings (JSON)', data=trace.to_json(), file_name='run_timings.json',
+                               mime='application/json')
+    st.sidebar.download_button('Timings (Prometheus)', data=trace.to_prometheus(), file_name='run_timings.prom',
+                               mime='text/plain')
+    stats = trace.profile_stats()
+    if stats:
+        with st.sidebar.expander('cProfile (top 30 by cumulative time)'):
+            st.text(stats)
 
-          rfc_bow_predictions = train_predict_model(classifier=rfc, train_features=cv_train_features, train_labels=train_sentiments,test_features=cv_test_features, test_labels=test_sentiments)
 
-          display_model_performance_metrics(true_labels=test_sentiments, predicted_labels=rfc_bow_predictions, classes=['positive', 'negative'])
+def display_shared_resources():
+    # Analyzers, stopwords and models are loaded once per process and shared by every
+    # session (sentiment_analyzer/resources.py); this shows what is resident.
+    from sentiment_analyzer.resources import get_resource_manager
+    manager = get_resource_manager()
+    rows = [{'resource': r['resource'],
+             'MiB': round(r['size_bytes'] / 2 ** 20, 1),
+             'in use': r['refs'],
+             'loads': r['loads'],
+             'hits': r['hits'],
+             'load s': round(r['load_seconds'], 2)}
+            for r in manager.stats() if r['loaded']]
+    if rows:
+        with st.sidebar.expander(f'Shared resources ({manager.total_bytes() / 2 ** 20:.1f} MiB)'):
+            st.dataframe(pd.DataFrame(rows).set_index('resource'))
 
-          classification_rep_bow = classification_report(true_labels=test_sentiments, predicted_labels=rfc_bow_predictions, classes=['positive', 'negative'])
 
-          df_bow = pd.DataFrame(classification_rep_bow).transpose()
-          df_bow.at['accuracy', 'precision'] = 0.0
-          df_bow.at['accuracy', 'recall'] = 0.0
+#################################################### main app.py
 
-          st.write(df_bow)
-          csv = convert_df(df_bow)
-          generate_download_button(csv_data=csv, filename='rfc_bow', file_label='rfc_bow')
+st.title('Welcome - Sentiment Analyzer')
+st.subheader('Supervised and Unsupervised Learning')
 
+menu = ['Home','About']
+choice = st.sidebar.selectbox('Menu', menu)
+profile_run = st.sidebar.checkbox('Profile this run (cProfile)')
+chart_backend = st.sidebar.selectbox('Charts', available_chart_backends())
+run_trace = start_run(choice, profile=profile_run)
+
+# finish_run also when st.stop(), a rerun or an error ends the script early
+try:
+    if choice == 'Home':
+      st.subheader('Welcome to the Sentiment Analyzer Streamlit Application')
+
+      sentence = st.text_input('Try the TextBlob sentiment analyzer in a sentence.')
+      if sentence:
+        from textblob import TextBlob
+        analysis = TextBlob(sentence)
+        analysis = analysis.sentiment
+        sent_sentence = polarity(sentence)
+        sent_sentence = analyze(sent_sentence)
+        st.write('The polarity and subjectivity of your sentence is', {analysis})
+        st.write('Here is the sentiment of your sentence:', {sent_sentence})
+      st.write('\n')
+      st.write('NOTE: If the polarity score is > 0 it means your sentence has a positive sentiment. If the polarity score is < 0 it means it has a negative sentiment (Try typing: I hate you). If the polarity score equals 0 its a neutral sentiment.')
+      task = st.selectbox('Select analysis type', ['Inspect CSV','Clean Text' ,'TextBlob', 'VADER', 'Clean + TextBlob + VADER', 'Logistic Regression', 'Support Vector Machine', 'Gradient Boosting Classifier', 'Random Forest Classifier', 'Compare All Models', 'Cross-Validation', 'Score New File', 'Explore Scored Reviews'])
+      compact_features = False
+      if task in ['Logistic Regression', 'Support Vector Machine', 'Gradient Boosting Classifier', 'Random Forest Classifier']:
+          compact_features = st.checkbox('Compact features (hashed float32 matrix, no vocabulary - less memory when the vocabulary is large, can be slower)')
+      split_strategy = 'head'
+      if task in ['Logistic Regression', 'Support Vector Machine', 'Gradient Boosting Classifier', 'Random Forest Classifier', 'Compare All Models']:
+          split_names = {'First 35000 rows train, the rest test': 'head', 'Random 70/30': 'ratio', 'Stratified 70/30': 'stratified'}
+          split_strategy = split_names[st.selectbox('Train/test split', list(split_names))]
+      if task == 'Inspect CSV':
+          st.header('Natural Language Processing')
+          st.subheader('Inspecting your csv file with sentiment column')
+
+          st.write(f'Please upload or drag and drop your csv file.')
+          #with st.expander('Value Counts and Bar Graph'):
+          csv_file = st.file_uploader('Upload File - Insepct')
+
+          if csv_file:
+
+            x = count_column_values(csv_file, 'sentiment')
+            display_value_counts(x)
+
+      if task == 'Clean Text':
+          st.header('Natural Language Processing: Text Cleaner')
+          st.subheader('Preprocessing your Data')
+          st.write('Please upload or drag and drop your csv file to initiate the preprocessing step.')
+          st.write('\n')
+          st.write('This Text-Cleaner is useful for the TextBlob and VADER Sentiment Analyzers.')
+          csv_file = st.file_uploader('Upload File - Preprocessing')
+          if csv_file:
+            require_nltk_resources(CLEAN_RESOURCES)
+            run_streaming_task(csv_file, clean_chunk, usecols=CLEAN_COLUMNS, filename='clean')
 
+      
+          st.write('This Text-Cleaner is useful for the Logistic Regression and Support Vector Machine Analyzers.')
+          st.write('Why? Unlike the Unsupervised Models we have (TextBlob and VADER), which calculate 3 sentiments, our Unsupervised Models only calculate 2 sentiments -> positive and negative.')
+          csv_file = st.file_uploader('Upload File - Preprocessing(sentiment column)')
+          if csv_file:
+            require_nltk_resources(CLEAN_RESOURCES)
+            run_streaming_task(csv_file, clean_sentiment_chunk, usecols=CLEAN_SENTIMENT_COLUMNS, filename='clean_with_sentiment')
 
-elif choice == 'About':
-    st.subheader('About Us')
-    st.write('1. Vicente De Leon')
-    st.write('Currently a grad student at IU Bloomington focusing on Data Science - Intelligent Systems Engineering domain. The Introduction to NLP in Python class taught me what AI can do in many fields and how important it is to the modern world. This web app shows you a sneek peek of its powerful techniques regarding NLP tasks.')
-    st.write('\n')
-    st.write('2. Seth Smithson')
-    st.write('\n')
-    st.write('3. Samaneh Torkzadeh')
-    st.write('\n')
\ No newline at end of file
+      if task == 'TextBlob':
+          st.subheader('TextBlob Lexicon Model')
+          st.write(f'Please upload or drag and drop your clean preprocess data.')
+          csv_file = st.file_uploader("Upload File (TextBlob Sentiment)")
+
+          if csv_file:
+            x, index = run_streaming_task(csv_file, textblob_chunk, usecols=TEXTBLOB_COLUMNS, filename='textblob_analysis',
+                                          count_column='sentiment', index_text_column='Clean Review')
+
+            display_value_counts(x)
+            explore_index(index, 'sentiment')
+
+
+
+      if task == 'VADER':
+          st.subheader('VADER Lexicon Model')
+          st.write('Please upload or drag and drop your data.')
+          st.write('VADER does not require preprocess data. It even takes on emojies!')
+          csv_file = st.file_uploader("Upload File")
+
+          if csv_file:
+            require_nltk_resources(VADER_RESOURCES)
+            x, index = run_streaming_task(csv_file, vader_chunk, usecols=VADER_COLUMNS, filename='vader_analysis',
+                                          count_column='sentiment', index_text_column='Review')
+
+            display_value_counts(x)
+            explore_index(index, 'sentiment')
+
+
+
+      if task == 'Clean + TextBlob + VADER':
+          st.subheader('Text Cleaner, TextBlob and VADER in one pass')
+          st.write('Please upload or drag and drop your data (Review column).')
+          st.write('Repeated reviews are cleaned and scored once, then copied back to every row.')
+          csv_file = st.file_uploader('Upload File - Clean + TextBlob + VADER')
+
+          if csv_file:
+            from functools import partial
+            from sentiment_analyzer.dedup import DedupStats
+            require_nltk_resources(CLEAN_RESOURCES + VADER_RESOURCES)
+            dedup_stats = DedupStats()
+            x, index = run_streaming_task(csv_file, partial(sentiment_chunk, stats=dedup_stats), usecols=SENTIMENT_COLUMNS,
+                                          filename='sentiment_analysis', count_column='vader_sentiment', index_text_column='Review')
+            if dedup_stats.rows:
+              st.write(f'{dedup_stats.rows} rows, {dedup_stats.unique_reviews} distinct reviews: '
+                       f'{dedup_stats.ratio:.2f}x less scoring work than row by row.')
+
+            display_value_counts(x)
+            explore_index(index, 'vader_sentiment')
+
+
+      if task == 'Support Vector Machine': 
+          st.subheader('Supervised Learning: Support Vector Machine')
+          st.write('Please upload or drag and drop your csv file.')
+          csv_file = st.file_uploader('Upload File - SVM (TF-IDF Model)')
+          if csv_file:
+            run_supervised_model(csv_file, 'tfidf', 'svm', filename='svm_tfidf', compact=compact_features, split=split_strategy)
+
+          csv_file = st.file_uploader('Upload File - SVM (BOW Model)')
+          if csv_file:
+            run_supervised_model(csv_file, 'bow', 'svm', filename='svm_bow', compact=compact_features, split=split_strategy)
+
+
+      if task == 'Logistic Regression':
+          st.subheader('Supervised Learning: Logistic Regression')
+          st.write('Please upload or drag and drop your csv file.')
+          csv_file = st.file_uploader('Upload File  - Logistic Regression (TF-IDF Model)')
+          if csv_file:
+            run_supervised_model(csv_file, 'tfidf', 'lr', filename='lr_tfidf', compact=compact_features, split=split_strategy)
+
+          csv_file = st.file_uploader('Upload File - Logistic Regression (BOW Model)')
+          if csv_file:
+            run_supervised_model(csv_file, 'bow', 'lr', filename='lr_bow', compact=compact_features, split=split_strategy)
+
+      if task == 'Gradient Boosting Classifier':
+            st.subheader('Supervised Learning: GradientBoost Classifier')
+            st.write('Please upload or drag and drop your csv file.')
+            csv_file = st.file_uploader('Upload File  - GradientBoost Classifier (TF-IDF Model)')
+            if csv_file:
+              run_supervised_model(csv_file, 'tfidf', 'gbc', filename='gbc_tfidf', compact=compact_features, split=split_strategy)
+
+            csv_file = st.file_uploader('Upload File - GradientBoost Classifier (BOW Model)')
+            if csv_file:
+              run_supervised_model(csv_file, 'bow', 'gbc', filename='gbc_bow', compact=compact_features, split=split_strategy)
+
+            compare_fast_ensemble(task, 'gbc', split_strategy)
+
+
+      if task == 'Random Forest Classifier':
+            st.subheader('Supervised Learning: RandomForest Classifier')
+            st.write('Please upload or drag and drop your csv file.')
+            csv_file = st.file_uploader('Upload File  - RandomForest Classifier (TF-IDF Model)')
+            if csv_file:
+              run_supervised_model(csv_file, 'tfidf', 'rfc', filename='rfc_tfidf', compact=compact_features, split=split_strategy)
+
+            csv_file = st.file_uploader('Upload File - RandomForest Classifier (BOW Model)')
+            if csv_file:
+              run_supervised_model(csv_file, 'bow', 'rfc', filename='rfc_bow', compact=compact_features, split=split_strategy)
+
+            compare_fast_ensemble(task, 'rfc', split_strategy)
+
+      if task == 'Compare All Models':
+          st.subheader('Supervised Learning: Compare All Models')
+          st.write('Please upload or drag and drop your csv file.')
+          st.write('TF-IDF and BOW features are extracted once and shared by all four classifiers.')
+          compare_params = {}
+          if st.checkbox('Also compare the compact feature sets and the fast ensembles (4 x 6 models, much slower)'):
+            from sentiment_analyzer.models import CLASSIFIERS, VECTORIZERS
+            compare_params = {'vectorizer_names': list(VECTORIZERS), 'classifier_names': list(CLASSIFIERS)}
+          csv_file = st.file_uploader('Upload File - Compare All Models')
+          df_compare = run_job('compare', csv_file, split=split_strategy, **compare_params) if csv_file else None
+          if df_compare is not None:
+            st.write(df_compare)
+            csv = convert_df(df_compare)
+            generate_download_button(csv_data=csv, filename='compare_all_models', file_label='compare_all_models')
+
+      if task == 'Cross-Validation':
+          from sentiment_analyzer.models import CLASSIFIER_TITLES, VECTORIZER_TITLES
+          st.subheader('Supervised Learning: Cross-Validation')
+          st.write('Please upload or drag and drop your csv file.')
+          st.write('Each fold extracts its features from its own training rows only; folds train in parallel.')
+          classifier_name = st.selectbox('Classifier', list(CLASSIFIER_TITLES), format_func=CLASSIFIER_TITLES.get)
+          vectorizer_name = st.selectbox('Features', list(VECTORIZER_TITLES), format_func=VECTORIZER_TITLES.get)
+          stratified = st.checkbox('Stratified folds', value=True)
+          n_splits = st.slider('Folds', min_value=2, max_value=10, value=5)
+          csv_file = st.file_uploader('Upload File - Cross-Validation')
+          result = None
+          if csv_file:
+            result = run_job('cross-validate', csv_file, vectorizer_name=vectorizer_name, classifier_name=classifier_name,
+                             strategy='stratified-kfold' if stratified else 'kfold', n_splits=n_splits)
+          if result is not None:
+            from sentiment_analyzer.evaluation import format_summary
+            folds, summary = result['folds'], result['summary']
+            st.write(folds)
+            for metric, value in format_summary(summary).items():
+                st.write(f'{metric}:', value)
+            csv = convert_df(folds)
+            generate_download_button(csv_data=csv, filename='cross_validation', file_label='cross_validation')
+
+      if task == 'Score New File':
+          from functools import partial
+          from sentiment_analyzer.inference import predict_chunk
+          from sentiment_analyzer.models import CLASSIFIER_TITLES, VECTORIZER_TITLES
+          from sentiment_analyzer.registry import get_default_registry
+          st.subheader('Supervised Learning: Score a new, unlabeled file')
+          st.write('Apply a model trained in one of the tasks above; every review gets a predicted label and a confidence score.')
+          registry = get_default_registry()
+          model_keys = list(registry.entries())
+          if not model_keys:
+            st.write('No trained models yet - train one in a supervised task first.')
+          else:
+            def describe_model(key):
+              meta = registry.meta(key)
+              if not meta:
+                return key[:12]
+              return (f"{CLASSIFIER_TITLES.get(meta.get('classifier'), meta.get('classifier'))} + "
+                      f"{VECTORIZER_TITLES.get(meta.get('vectorizer'), meta.get('vectorizer'))} "
+                      f"({meta.get('n_train', meta.get('n_seen'))} training reviews) - {key[:8]}")
+            model_key = st.selectbox('Model', model_keys, format_func=describe_model)
+            column = st.radio('Text column', ['Review', 'Clean Review'])
+            csv_file = st.file_uploader('Upload File - Score New File')
+            if csv_file:
+              if column == 'Review':
+                require_nltk_resources(CLEAN_RESOURCES)
+              x, index = run_streaming_task(csv_file, partial(predict_chunk, model_key=model_key, column=column, clean=column == 'Review'),
+                                            usecols=[column], filename=f'predictions_{model_key[:8]}', count_column='prediction',
+                                            index_text_column=column)
+              display_value_counts(x)
+              explore_index(index, 'prediction')
+
+      if task == 'Explore Scored Reviews':
+          from sentiment_analyzer.corpus_index import list_indexes, open_index
+          st.subheader('Explore previously scored files')
+          st.write('Every TextBlob, VADER and model scoring run is kept as an index, so it can be filtered again without re-uploading.')
+          index_names = list_indexes()
+          if not index_names:
+            st.write('Nothing scored yet.')
+          else:
+            index = open_index(st.selectbox('Scored file', index_names))
+            st.write(f"{index.meta['source']}: {index.n_rows} reviews")
+            explore_index(index, st.selectbox('Label', index.label_columns))
+
+
+    elif choice == 'About':
+        st.subheader('About Us')
+        st.write('1. Vicente De Leon')
+        st.write('Currently a grad student at IU Bloomington focusing on Data Science - Intelligent Systems Engineering domain. The Introduction to NLP in Python class taught me what AI can do in many fields and how important it is to the modern world. This web app shows you a sneek peek of its powerful techniques regarding NLP tasks.')
+        st.write('\n')
+        st.write('2. Seth Smithson')
+        st.write('\n')
+        st.write('3. Samaneh Torkzadeh')
+        st.write('\n')
+finally:
+    finish_run(run_trace)
+
+if run_trace.records:
+    display_run_timings(run_trace)
+display_shared_resources()
@@ -0,0 +1 @@
+# Headless pipeline pieces used by app.py (Streamlit UI) and the batch entry points.
@@ -0,0 +1,273 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.parallel import cpu_count
+
+
+######################### synthetic review corpora
+
+_POSITIVE = ['good', 'great', 'love', 'loved', 'excellent', 'amazing', 'wonderful', 'best', 'fun',
+             'enjoyed', 'brilliant', 'perfect', 'beautiful', 'favorite', 'recommend', 'superb']
+_NEGATIVE = ['bad', 'awful', 'hate', 'boring', 'worst', 'terrible', 'waste', 'poor', 'annoying',
+             'horrible', 'crash', 'crashes', 'stupid', 'disappointing', 'broken', 'ads']
+_NEUTRAL = ['movie', 'film', 'app', 'song', 'music', 'story', 'plot', 'actor', 'scene', 'update',
+            'playlist', 'time', 'people', 'character', 'ending', 'phone', 'version', 'sound',
+            'really', 'just', 'even', 'much', 'still', 'would', 'could', 'first', 'two', 'way']
+_STOP = ['the', 'a', 'and', 'is', 'it', 'this', 'was', 'of', 'to', 'in', 'i', 'not', 'but', 'very']
+_NOISE = ['!', '.', ',', '?', '...', '<br /><br />', ':)', '10/10', "don't", "can't", '#1']
+
+DEFAULT_DUPLICATE_RATE = 0.05
+
+
+def make_corpus(n_rows, seed=0, duplicate_rate=DEFAULT_DUPLICATE_RATE, min_words=5, max_words=60):
+    # Movie/app-review-like rows with the Review and sentiment columns app.py expects:
+    # label-correlated sentiment words mixed with topic words, stop words, punctuation and
+    # casing, plus a share of exact duplicates like real scraped reviews. The same seed
+    # always gives the same corpus.
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(np.array(['positive', 'negative']), size=n_rows)
+    lengths = rng.integers(min_words, max_words + 1, size=n_rows)
+    filler = np.array(_NEUTRAL + _STOP + _NOISE, dtype=object)
+    positive, negative = np.array(_POSITIVE, dtype=object), np.array(_NEGATIVE, dtype=object)
+
+    total = int(lengths.sum())
+    words = filler[rng.integers(len(filler), size=total)]
+    # about a fifth of the words carry sentiment, 80% of them agreeing with the label
+    is_sentiment = rng.random(total) < 0.2
+    agrees = rng.random(total) < 0.8
+    row_positive = np.repeat(labels == 'positive', lengths)
+    use_positive = is_sentiment & (row_positive == agrees)
+    use_negative = is_sentiment & (row_positive != agrees)
+    words[use_positive] = positive[rng.integers(len(positive), size=int(use_positive.sum()))]
+    words[use_negative] = negative[rng.integers(len(negative), size=int(use_negative.sum()))]
+    shout = rng.random(total) < 0.03
+    words[shout] = [w.upper() for w in words[shout]]
+
+    ends = np.cumsum(lengths)
+    reviews = np.array([' '.join(words[end - length:end]) for end, length in zip(ends, lengths)],
+                       dtype=object)
+    if duplicate_rate and n_rows > 1:
+        n_duplicates = int(n_rows * duplicate_rate)
+        targets = rng.choice(n_rows, size=n_duplicates, replace=False)
+        sources = rng.integers(n_rows, size=n_duplicates)
+        reviews[targets], labels[targets] = reviews[sources], labels[sources]
+    return pd.DataFrame({'Review': reviews, 'sentiment': labels})
+
+
+######################### stages
+
+# Each stage is setup(corpus, n_jobs) -> (run, n_docs). Setup work (cleaning the input,
+# fitting the vectorizer a classifier needs, warming a cache) is not timed; run() is.
+
+def _clean(corpus, n_jobs):
+    from sentiment_analyzer.normalize import normalize_corpus
+    if 'Clean Review' not in corpus:
+        corpus['Clean Review'] = normalize_corpus(corpus['Review'], n_jobs=n_jobs)
+    return corpus['Clean Review']
+
+
+def _setup_normalize(corpus, n_jobs):
+    from sentiment_analyzer.normalize import normalize_corpus
+    reviews = corpus['Review']
+    return lambda: normalize_corpus(reviews, n_jobs=n_jobs), len(reviews)
+
+
+def _setup_normalize_cached(corpus, n_jobs):
+    # warm cache: what a rerun on an already-seen upload costs in a fresh process (SQLite
+    # hits; the in-memory LRU is emptied first). The directory lives as long as run().
+    from sentiment_analyzer.cache import NormalizationCache
+
+    cache_dir = tempfile.TemporaryDirectory(prefix='sentiment-bench-')
+    cache = NormalizationCache(os.path.join(cache_dir.name, 'normalize.sqlite'))
+    reviews = corpus['Review'].tolist()
+    cache.normalize(reviews, n_jobs=n_jobs)
+
+    def run(cache_dir=cache_dir):
+        cache._memory.clear()
+        return cache.normalize(reviews, n_jobs=n_jobs)
+    return run, len(reviews)
+
+
+def _setup_textblob(corpus, n_jobs):
+    from sentiment_analyzer.blob import score_textblob
+    reviews = _clean(corpus, n_jobs)
+    return lambda: score_textblob(reviews, n_jobs=n_jobs), len(reviews)
+
+
+def _setup_vader(corpus, n_jobs):
+    # cold: the per-process memo would otherwise answer repeats from the previous run,
+    # and emptying it here would not reach the pool workers, so it is bypassed everywhere
+    from sentiment_analyzer.vader import score_vader
+    reviews = corpus['Review']
+    return lambda: score_vader(reviews, n_jobs=n_jobs, memo=False), len(reviews)
+
+
+def _split(corpus, n_jobs):
+    from sentiment_analyzer.evaluation import make_splits
+    reviews = _clean(corpus, n_jobs).to_numpy()
+    labels = corpus['sentiment'].to_numpy()
+    train, test = make_splits(labels, strategy='ratio', test_size=0.3)[0]
+    return reviews[train], labels[train], reviews[test], labels[test]
+
+
+def _fit_stage(vectorizer_name):
+    def setup(corpus, n_jobs):
+        from sentiment_analyzer.models import make_vectorizer
+        train_reviews = _split(corpus, n_jobs)[0]
+        return lambda: make_vectorizer(vectorizer_name).fit_transform(train_reviews), len(train_reviews)
+    return setup
+
+
+def _transform_stage(vectorizer_name):
+    def setup(corpus, n_jobs):
+        from sentiment_analyzer.models import make_vectorizer
+        train_reviews, _, test_reviews, _ = _split(corpus, n_jobs)
+        vectorizer = make_vectorizer(vectorizer_name).fit(train_reviews)
+        return lambda: vectorizer.transform(test_reviews), len(test_reviews)
+    return setup
+
+
+def _train_stage(classifier_name, vectorizer_name='tfidf'):
+    # the train_predict_model step of the UI: fit on the training split, predict the test split
+    def setup(corpus, n_jobs):
+        from sentiment_analyzer.models import make_classifier, make_vectorizer
+        train_reviews, train_labels, test_reviews, _ = _split(corpus, n_jobs)
+        vectorizer = make_vectorizer(vectorizer_name)
+        train_features = vectorizer.fit_transform(train_reviews)
+        test_features = vectorizer.transform(test_reviews)
+
+        def run():
+            classifier = make_classifier(classifier_name).fit(train_features, train_labels)
+            return classifier.predict(test_features)
+        return run, len(train_reviews) + len(test_reviews)
+    return setup
+
+
+STAGES = {
+    'normalize': _setup_normalize,
+    'normalize-cached': _setup_normalize_cached,
+    'textblob': _setup_textblob,
+    'vader': _setup_vader,
+    'fit:tfidf': _fit_stage('tfidf'),
+    'fit:bow': _fit_stage('bow'),
+    'fit:tfidf-compact': _fit_stage('tfidf-compact'),
+    'transform:tfidf': _transform_stage('tfidf'),
+    'transform:bow': _transform_stage('bow'),
+    'train:lr': _train_stage('lr'),
+    'train:svm': _train_stage('svm'),
+    'train:gbc': _train_stage('gbc'),
+    'train:rfc': _train_stage('rfc'),
+    'train:hgb': _train_stage('hgb'),
+    'train:rfc-fast': _train_stage('rfc-fast'),
+}
+
+# the original GBC/RFC take minutes past a few thousand rows, so they are opt-in
+DEFAULT_STAGES = [name for name in STAGES if name not in ('train:gbc', 'train:rfc')]
+
+
+######################### running and recording
+
+def _measure_peak(run):
+    # tracemalloc sees Python and numpy allocations of this process only, not worker
+    # processes, and slows pure-Python code down, so it gets its own untimed pass.
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(name, corpus, n_jobs=None, repeat=3, memory=True):
+    run, n_docs = STAGES[name](corpus, n_jobs)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        'stage': name,
+        'docs': n_docs,
+        'seconds': best,
+        'seconds_all': timings,
+        'docs_per_sec': n_docs / max(best, 1e-9),
+        'peak_bytes': _measure_peak(run) if memory else None,
+    }
+
+
+def _package_versions():
+    from importlib import metadata
+    versions = {}
+    for name in ['numpy', 'pandas', 'scikit-learn', 'nltk', 'textblob', 'joblib']:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(n_rows=10000, stages=None, n_jobs=None, repeat=3, seed=0, memory=True,
+                   progress=None):
+    # Returns a JSON-serializable dict: environment, options and one result per stage.
+    stages = DEFAULT_STAGES if stages is None else stages
+    corpus = make_corpus(n_rows, seed=seed)
+    results = []
+    for name in stages:
+        result = run_stage(name, corpus, n_jobs=n_jobs, repeat=repeat, memory=memory)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': cpu_count(),
+        'packages': _package_versions(),
+        'options': {'rows': n_rows, 'seed': seed, 'n_jobs': n_jobs, 'repeat': repeat,
+                    'duplicate_rate': DEFAULT_DUPLICATE_RATE},
+        'results': results,
+    }
+
+
+def save_results(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current):
+    # speedup > 1 means `current` is faster than `baseline` on that stage
+    old = pd.DataFrame(baseline['results']).set_index('stage')
+    new = pd.DataFrame(current['results']).set_index('stage')
+    table = pd.DataFrame({
+        'baseline_docs_per_sec': old['docs_per_sec'],
+        'docs_per_sec': new['docs_per_sec'],
+    }).dropna()
+    table['speedup'] = table['docs_per_sec'] / table['baseline_docs_per_sec']
+    if old['peak_bytes'].notna().any() and new['peak_bytes'].notna().any():
+        table['peak_ratio'] = new['peak_bytes'] / old['peak_bytes']
+    return table
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.dedup import factorize_texts, scatter
+from sentiment_analyzer.parallel import map_chunks
+from sentiment_analyzer.resources import shared
+
+
+######################### batched TextBlob scoring
+
+TEXTBLOB_SCORE_COLUMNS = ['polarity', 'subjectivity']
+DEFAULT_CHUNK_SIZE = 5000
+
+def _load_textblob_analyzer():
+    from textblob.en.sentiments import PatternAnalyzer
+    return PatternAnalyzer()
+
+
+def get_textblob_analyzer():
+    # TextBlob(txt).sentiment is PatternAnalyzer().analyze(txt); calling the analyzer
+    # directly skips building a blob per document.
+    return shared('textblob_analyzer', _load_textblob_analyzer)
+
+
+def _score_texts(texts):
+    analyzer = get_textblob_analyzer()
+    out = np.full((len(texts), len(TEXTBLOB_SCORE_COLUMNS)), np.nan)
+    for i, txt in enumerate(texts):
+        if not isinstance(txt, (str, bytes)):
+            # TextBlob refuses anything else, which polarity()/subjectivity() turn into None
+            continue
+        try:
+            sentiment = analyzer.analyze(txt)
+        except Exception:
+            continue
+        out[i] = sentiment.polarity, sentiment.subjectivity
+    return out
+
+
+def score_textblob(texts, n_jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # One parse per distinct document gives polarity and subjectivity together; the
+    # distinct documents are spread over the shared worker pool for large inputs.
+    index = texts.index if isinstance(texts, pd.Series) else None
+    codes, uniques = factorize_texts(texts)
+
+    parts = map_chunks(_score_texts, uniques, n_jobs=n_jobs, chunk_size=chunk_size)
+    unique_scores = np.vstack(parts) if parts else np.empty((0, len(TEXTBLOB_SCORE_COLUMNS)))
+    return pd.DataFrame(scatter(unique_scores, codes), columns=TEXTBLOB_SCORE_COLUMNS, index=index)
+
+
+def textblob_labels(polarity):
+    # Vectorized analyze(): same comparisons, so NaN still falls through to 'positive'.
+    polarity = np.asarray(polarity, dtype=float)
+    return np.select([polarity < 0, polarity == 0], ['negative', 'neutral'], default='positive')
@@ -0,0 +1,207 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from sentiment_analyzer import normalize
+from sentiment_analyzer.instrument import stage as timed
+
+
+######################### on-disk locations
+
+def get_cache_dir(*parts):
+    root = os.environ.get('SENTIMENT_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'sentiment_analyzer'))
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+######################### normalization cache
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMORY_ITEMS = 200000
+_LOOKUP_BATCH = 500
+BUSY_TIMEOUT = 30.0
+
+
+def cleaning_config_digest(stop_words=None):
+    # Everything that changes the output of normalize_document goes in here, so a new
+    # stopword list or regex never serves stale rows.
+    if stop_words is None:
+        stop_words = normalize.get_stop_words()
+    h = hashlib.blake2b(digest_size=32)
+    h.update(normalize._NON_ALNUM.pattern.encode())
+    h.update(str(normalize._SUB_COUNT).encode())
+    h.update(repr(sorted(normalize._CONTRACTIONS.items())).encode())
+    h.update('\n'.join(sorted(stop_words)).encode())
+    return h.digest()
+
+
+class NormalizationCache:
+    # Maps blake2b(config, document) -> cleaned document in a SQLite file. Every hit
+    # bumps the row's access tick, and once the stored text exceeds max_bytes the least
+    # recently used rows are dropped until we are back under 90% of the budget.
+    # A bounded in-memory LRU sits in front so Streamlit reruns in the same process
+    # skip SQLite entirely.
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_items=DEFAULT_MEMORY_ITEMS):
+        if path is None:
+            path = os.path.join(get_cache_dir(), 'normalize.sqlite')
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Other processes (CLI runs, pool workers) may write the same file: wait for their
+        # locks instead of failing with "database is locked".
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT)
+        self._conn.execute(f'PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS docs ('
+                           'key BLOB PRIMARY KEY, value TEXT NOT NULL, '
+                           'size INTEGER NOT NULL, tick INTEGER NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS docs_tick ON docs (tick)')
+        self._tick, self._size = self._conn.execute(
+            'SELECT COALESCE(MAX(tick), 0), COALESCE(SUM(size), 0) FROM docs').fetchone()
+        self._config = None
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+
+    def keys_for(self, docs):
+        if self._config is None:
+            self._config = cleaning_config_digest()
+        return [hashlib.blake2b(doc.encode('utf-8', 'surrogatepass'),
+                                digest_size=16, key=self._config).digest()
+                for doc in docs]
+
+    @contextlib.contextmanager
+    def _write(self):
+        # IMMEDIATE takes the write lock up front (waiting up to busy_timeout); a deferred
+        # transaction that starts reading and then writes fails at once when another
+        # connection holds the lock.
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _remember(self, items):
+        for key, value in items:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._memory.get(key)
+                if value is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = value
+            keys = [key for key in keys if key not in found]
+            if not keys:
+                return found
+            hits = {}
+            self._tick += 1
+            with self._write():
+                for start in range(0, len(keys), _LOOKUP_BATCH):
+                    batch = keys[start:start + _LOOKUP_BATCH]
+                    marks = ','.join('?' * len(batch))
+                    hits.update(self._conn.execute(
+                        f'SELECT key, value FROM docs WHERE key IN ({marks})', batch))
+                    self._conn.execute(f'UPDATE docs SET tick = ? WHERE key IN ({marks})',
+                                       [self._tick, *batch])
+            self._remember(hits.items())
+        found.update(hits)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._tick += 1
+            rows = [(key, value, len(key) + len(value), self._tick) for key, value in items]
+            with self._write():
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO docs (key, value, size, tick) VALUES (?, ?, ?, ?)', rows)
+            self._size += sum(row[2] for row in rows)
+            self._remember(items)
+            self._evict()
+
+    def _evict(self):
+        # _size is a running upper bound (replaced rows and other writers make it drift),
+        # so the exact SUM scan only runs once the bound passes the budget.
+        if self._size <= self.max_bytes:
+            return
+        total = self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM docs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute('SELECT key, size FROM docs ORDER BY tick'):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany('DELETE FROM docs WHERE key = ?', stale)
+        self._size = total - freed
+
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM docs').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM docs')
+            self._memory.clear()
+            self._size = 0
+
+    def normalize(self, docs, n_jobs=None, chunk_size=normalize.DEFAULT_CHUNK_SIZE):
+        # Only documents never seen under this cleaning config reach normalize_corpus.
+        docs = list(docs)
+        keys = self.keys_for(docs)
+        found = self.get_many(list(set(keys)))
+
+        missing = {}
+        for key, doc in zip(keys, docs):
+            if key not in found and key not in missing:
+                missing[key] = doc
+        if missing:
+            cleaned = normalize.normalize_corpus(list(missing.values()), n_jobs=n_jobs,
+                                                 chunk_size=chunk_size)
+            new_items = list(zip(missing.keys(), cleaned.tolist()))
+            self.put_many(new_items)
+            found.update(new_items)
+
+        if not docs:
+            return np.array([], dtype=str)
+        return np.array([found[key] for key in keys])
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = NormalizationCache()
+        return _default_cache
+
+
+def cached_normalize_corpus(docs, cache=None, n_jobs=None,
+                            chunk_size=normalize.DEFAULT_CHUNK_SIZE):
+    if cache is None:
+        cache = get_default_cache()
+    with timed('normalize', rows=len(docs)):
+        return cache.normalize(docs, n_jobs=n_jobs, chunk_size=chunk_size)
@@ -0,0 +1,117 @@
+import hashlib
+import importlib.util
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+######################### bar charts from pre-aggregated counts, rendered once to PNG
+
+# backend -> module it needs; 'native' hands the counts to Streamlit's own chart
+CHART_BACKENDS = {
+    'matplotlib': 'matplotlib',
+    'native': None,
+}
+
+FIGSIZE = (14, 5)
+DPI = 80
+MAX_CACHE_BYTES = 16 * 2 ** 20
+
+
+def available_backends():
+    return [backend for backend, module in CHART_BACKENDS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+class PngCache:
+    # Rendered charts by content hash, least recently used dropped first once the PNGs
+    # add up to more than max_bytes. Shared by every session, so a rerun with the same
+    # counts (every widget change does one) skips matplotlib altogether.
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is None:
+                return None
+            self._items.move_to_end(key)
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key not in self._items:
+                self.bytes += len(png)
+            self._items[key] = png
+            while self.bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.bytes -= len(old)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_png_cache = PngCache()
+
+
+def _chart_key(kind, *parts):
+    h = hashlib.blake2b(kind.encode(), digest_size=16)
+    for part in parts:
+        h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+def _render(draw, figsize, dpi):
+    # A bare Figure is not registered with pyplot, so nothing keeps it alive once the
+    # PNG is written: no plt.close() to forget, no figures piling up across reruns.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        draw(fig.subplots())
+        fig.tight_layout()
+        out = io.BytesIO()
+        fig.savefig(out, format='png')
+        return out.getvalue()
+    finally:
+        fig.clear()
+
+
+def bar_png(labels, values, xlabel=None, ylabel=None, figsize=FIGSIZE, dpi=DPI):
+    # One bar per label (value_counts() style input), one colour per bar as seaborn's barplot.
+    labels = [str(label) for label in labels]
+    values = np.asarray(values, dtype=float)
+    key = _chart_key('bar', labels, values.tolist(), xlabel, ylabel, figsize, dpi)
+    png = _png_cache.get(key)
+    if png is None:
+        def draw(ax):
+            ax.bar(labels, values, color=[f'C{i % 10}' for i in range(len(labels))])
+            ax.set_xlabel(xlabel or '')
+            ax.set_ylabel(ylabel or '')
+        png = _render(draw, figsize, dpi)
+        _png_cache.put(key, png)
+    return png
+
+
+def histogram_png(counts, edges, xlabel=None, figsize=FIGSIZE, dpi=DPI):
+    # counts/edges as returned by np.histogram (or a precomputed index histogram).
+    counts = np.asarray(counts, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    key = _chart_key('hist', counts.tolist(), edges.tolist(), xlabel, figsize, dpi)
+    png = _png_cache.get(key)
+    if png is None:
+        def draw(ax):
+            ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='white')
+            ax.set_xlabel(xlabel or '')
+            ax.set_ylabel('reviews')
+        png = _render(draw, figsize, dpi)
+        _png_cache.put(key, png)
+    return png
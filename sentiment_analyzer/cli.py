@@ -0,0 +1,400 @@
+import argparse
+import functools
+import sys
+import time
+
+from sentiment_analyzer.ingest import DEFAULT_CHUNK_ROWS, iter_csv_chunks, stream_stage, write_stream
+from sentiment_analyzer.benchmark import STAGES
+from sentiment_analyzer.evaluation import SPLIT_STRATEGIES
+from sentiment_analyzer.export import EXPORT_FORMATS
+from sentiment_analyzer.models import CLASSIFIERS, VECTORIZERS
+from sentiment_analyzer.startup import CLEAN_RESOURCES, VADER_RESOURCES, ensure_nltk_resources
+
+
+######################### headless entry point: python -m sentiment_analyzer <command>
+
+def _log(args, message):
+    if not args.quiet:
+        print(message, file=sys.stderr)
+
+
+def _report_progress(args):
+    def report(rows_done, fraction):
+        if fraction is None:
+            _log(args, f'{rows_done} rows')
+        else:
+            _log(args, f'{rows_done} rows ({fraction:.0%})')
+    return report
+
+
+def _run_stage(args, stage, usecols):
+    start = time.perf_counter()
+    stage = functools.partial(stage, n_jobs=args.jobs)
+    chunks = stream_stage(args.input, stage, usecols=usecols, chunk_rows=args.chunk_rows,
+                          progress=_report_progress(args))
+    _, _, n_rows = write_stream(chunks, args.output, fmt=args.format)
+    elapsed = time.perf_counter() - start
+    _log(args, f'{n_rows} rows in {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):.0f} rows/s) -> {args.output}')
+    return 0
+
+
+def cmd_clean(args):
+    from sentiment_analyzer.scoring import (CLEAN_COLUMNS, CLEAN_SENTIMENT_COLUMNS,
+                                            clean_chunk, clean_sentiment_chunk)
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    if args.with_sentiment:
+        return _run_stage(args, clean_sentiment_chunk, CLEAN_SENTIMENT_COLUMNS)
+    return _run_stage(args, clean_chunk, CLEAN_COLUMNS)
+
+
+def cmd_textblob(args):
+    from sentiment_analyzer.scoring import TEXTBLOB_COLUMNS, textblob_chunk
+    return _run_stage(args, textblob_chunk, TEXTBLOB_COLUMNS)
+
+
+def cmd_vader(args):
+    from sentiment_analyzer.scoring import VADER_COLUMNS, vader_chunk
+    ensure_nltk_resources(VADER_RESOURCES)
+    return _run_stage(args, vader_chunk, VADER_COLUMNS)
+
+
+def cmd_score(args):
+    from sentiment_analyzer.dedup import DedupStats
+    from sentiment_analyzer.scoring import SENTIMENT_COLUMNS, sentiment_chunk
+    ensure_nltk_resources(CLEAN_RESOURCES + VADER_RESOURCES)
+    stats = DedupStats()
+    status = _run_stage(args, functools.partial(sentiment_chunk, stats=stats), SENTIMENT_COLUMNS)
+    _log(args, f'{stats.unique_reviews} distinct reviews ({stats.unique_clean} after cleaning), '
+               f'dedup ratio {stats.ratio:.2f}')
+    return status
+
+
+def _load_tuned_config(args):
+    # `tune` keys its results by the fingerprint of the whole cleaned, labeled file
+    from sentiment_analyzer.cache import cached_normalize_corpus
+    from sentiment_analyzer.pipeline import read_labeled_reviews
+    from sentiment_analyzer.registry import fingerprint_data
+    from sentiment_analyzer.tuning import load_best_config
+
+    reviews, labels = read_labeled_reviews(args.input, chunk_rows=args.chunk_rows)
+    return load_best_config(fingerprint_data(cached_normalize_corpus(reviews, n_jobs=args.jobs), labels))
+
+
+def cmd_train(args):
+    from sentiment_analyzer.pipeline import load_supervised_data, train_and_evaluate
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    start = time.perf_counter()
+    train_reviews, train_labels, test_reviews, test_labels = load_supervised_data(
+        args.input, train_rows=args.train_rows, n_jobs=args.jobs, strategy=args.split,
+        test_size=args.test_size)
+    vectorizer_name, classifier_name = args.vectorizer, args.classifier
+    vectorizer_kwargs = classifier_kwargs = None
+    if args.tuned:
+        best = _load_tuned_config(args)
+        if best is None:
+            print('no tuning results for this data, run `tune` first', file=sys.stderr)
+            return 1
+        vectorizer_name, classifier_name = best['vectorizer'], best['classifier']
+        vectorizer_kwargs, classifier_kwargs = best['vectorizer_kwargs'], best['classifier_kwargs']
+    result = train_and_evaluate(vectorizer_name, classifier_name, train_reviews, train_labels,
+                                test_reviews, test_labels, vectorizer_kwargs=vectorizer_kwargs,
+                                classifier_kwargs=classifier_kwargs)
+    elapsed = time.perf_counter() - start
+
+    print(f'model: {result["key"]}')
+    print(f'train shape: {result["train_shape"]}  test shape: {result["test_shape"]}')
+    for name, value in result['metrics'].items():
+        print(f'{name}: {value:.4f}')
+    _log(args, f'{"loaded" if result["from_cache"] else "trained"} in {elapsed:.2f}s')
+    return 0
+
+
+def cmd_evaluate(args):
+    from sentiment_analyzer.cache import cached_normalize_corpus
+    from sentiment_analyzer.evaluation import cross_validate, format_summary
+    from sentiment_analyzer.pipeline import read_labeled_reviews
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    start = time.perf_counter()
+    reviews, labels = read_labeled_reviews(args.input, chunk_rows=args.chunk_rows)
+    folds, summary = cross_validate(cached_normalize_corpus(reviews, n_jobs=args.jobs), labels,
+                                    args.vectorizer, args.classifier, strategy=args.split,
+                                    n_splits=args.folds, test_size=args.test_size, n_jobs=args.jobs)
+    print(folds.round(4).to_string())
+    for metric, value in format_summary(summary).items():
+        print(f'{metric}: {value}')
+    _log(args, f'{len(folds)} folds in {time.perf_counter() - start:.2f}s')
+    return 0
+
+
+def cmd_tune(args):
+    start = time.perf_counter()
+    from sentiment_analyzer.cache import cached_normalize_corpus
+    from sentiment_analyzer.pipeline import read_labeled_reviews
+    from sentiment_analyzer.registry import fingerprint_data
+    from sentiment_analyzer.tuning import make_candidates, save_best_config, successive_halving
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    reviews, labels = read_labeled_reviews(args.input, chunk_rows=args.chunk_rows)
+    reviews = cached_normalize_corpus(reviews, n_jobs=args.jobs)
+    candidates = make_candidates(args.vectorizer, args.classifier)
+    _log(args, f'{len(candidates)} candidates, budget {args.budget:.0f}s')
+    # importing, reading and cleaning count against the budget too
+    budget = max(args.budget - (time.perf_counter() - start), 0.0)
+    best, history = successive_halving(reviews, labels, candidates, budget=budget, eta=args.eta,
+                                       min_rows=args.min_rows, n_jobs=args.jobs)
+    if best is None:
+        print('budget exhausted before any candidate finished', file=sys.stderr)
+        return 1
+    path = save_best_config(fingerprint_data(reviews, labels), best)
+    print(f'best: {best["vectorizer"]} {best["vectorizer_kwargs"]} + {best["classifier"]} '
+          f'{best["classifier_kwargs"]}')
+    print(f'f1: {best["f1"]:.4f}  accuracy: {best["accuracy"]:.4f}  on {best["n_rows"]} training rows')
+    _log(args, f'{len(history)} fits in {time.perf_counter() - start:.2f}s, saved to {path}')
+    return 0
+
+
+def cmd_train_online(args):
+    from sentiment_analyzer.online import OnlineSVM, checkpoint_key
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    start = time.perf_counter()
+    model = OnlineSVM(args.name)
+    n_rows = model.train_stream(args.input, chunk_rows=args.chunk_rows, n_jobs=args.jobs,
+                                progress=lambda rows, total: _log(args, f'{rows} new rows, {total} seen in total'))
+    elapsed = time.perf_counter() - start
+    print(f'model: {checkpoint_key(args.name)}')
+    _log(args, f'{n_rows} rows in {elapsed:.2f}s over {model.meta["batches"]} batches so far')
+    return 0
+
+
+def cmd_features(args):
+    from sentiment_analyzer.features import extract_features
+    from sentiment_analyzer.pipeline import read_labeled_reviews
+    from sentiment_analyzer.cache import cached_normalize_corpus
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    reviews, _ = read_labeled_reviews(args.input, chunk_rows=args.chunk_rows)
+    reviews = cached_normalize_corpus(reviews, n_jobs=args.jobs)
+    for name in args.vectorizer or ['tfidf', 'tfidf-compact']:
+        memmap_dir = f'{args.memmap}/{name}' if args.memmap else None
+        _, _, report = extract_features(reviews, name, memmap_dir=memmap_dir, trace_memory=True)
+        print(f'{name}: shape {report["shape"]}, {report["dtype"]}, vocabulary {report["vocabulary_size"]}, '
+              f'matrix {report["matrix_bytes"] / 2 ** 20:.1f} MiB, peak {report["peak_bytes"] / 2 ** 20:.1f} MiB, '
+              f'{report["fit_seconds"]:.2f}s')
+    return 0
+
+
+def cmd_predict(args):
+    from sentiment_analyzer.inference import predict_chunks
+    from sentiment_analyzer.registry import get_default_registry
+
+    if get_default_registry().load(args.model) is None:
+        print(f'no model {args.model!r} in the registry, run `train` first', file=sys.stderr)
+        return 1
+    clean = args.clean if args.clean is not None else args.column != 'Clean Review'
+    if clean:
+        ensure_nltk_resources(CLEAN_RESOURCES)
+
+    start = time.perf_counter()
+    rows_read = 0
+
+    def counted(chunks):
+        nonlocal rows_read
+        for chunk in chunks:
+            rows_read += len(chunk)
+            _log(args, f'{rows_read} rows read')
+            yield chunk
+    skipped = 0
+
+    def evaluated(chunks):
+        # the confusion matrix is counted as predictions stream past, never held whole;
+        # rows whose label is not one of CLASSES (or that have no prediction) are left out
+        nonlocal skipped
+        for chunk in chunks:
+            scored = chunk[args.labels].isin(CLASSES) & chunk['prediction'].notna()
+            skipped += int((~scored).sum())
+            matrix.update(chunk.loc[scored, args.labels], chunk.loc[scored, 'prediction'])
+            yield chunk
+    usecols = list(dict.fromkeys(args.keep + [args.column] + ([args.labels] if args.labels else [])))
+    chunks = counted(iter_csv_chunks(args.input, usecols=usecols, chunk_rows=args.chunk_rows))
+    predictions = predict_chunks(chunks, args.model, column=args.column, clean=clean,
+                                 n_jobs=args.jobs, n_threads=args.threads)
+    if args.labels:
+        from sentiment_analyzer.metrics import ConfusionMatrix
+        from sentiment_analyzer.pipeline import CLASSES
+        matrix = ConfusionMatrix(CLASSES)
+        predictions = evaluated(predictions)
+    _, _, n_rows = write_stream(predictions, args.output, fmt=args.format)
+    elapsed = time.perf_counter() - start
+    _log(args, f'{n_rows} rows in {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):.0f} rows/s) -> {args.output}')
+    if args.labels:
+        if skipped:
+            print(f'{skipped} rows without a {" or ".join(CLASSES)} label left out of the scores', file=sys.stderr)
+        for name, value in matrix.scores().items():
+            print(f'{name}: {value:.4f}')
+        print(matrix.frame().to_string())
+        print(matrix.report().round(4).to_string())
+    return 0
+
+
+def cmd_startup_check(args):
+    from sentiment_analyzer.startup import check_import_budget
+    try:
+        within_budget, timings = check_import_budget(budget=args.budget)
+    except ImportError as exc:
+        print(f'home imports failed: {exc}', file=sys.stderr)
+        return 1
+    print(f'home imports: {timings["imports"]:.3f}s (budget {args.budget:.2f}s), '
+          f'interpreter total: {timings["interpreter"]:.3f}s')
+    return 0 if within_budget else 1
+
+
+def cmd_serve(args):
+    from sentiment_analyzer.server import serve
+    ensure_nltk_resources(CLEAN_RESOURCES + VADER_RESOURCES)
+    _log(args, f'serving on http://{args.host}:{args.port}')
+    try:
+        serve(args.model, host=args.host, port=args.port, max_batch=args.max_batch,
+              max_wait=args.max_wait_ms / 1000)
+    except KeyError as exc:
+        print(exc.args[0], file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_bench(args):
+    from sentiment_analyzer.benchmark import compare_results, load_results, run_benchmarks, save_results
+
+    ensure_nltk_resources(CLEAN_RESOURCES + VADER_RESOURCES)
+
+    def report(result):
+        peak = '' if result['peak_bytes'] is None else f', peak {result["peak_bytes"] / 2 ** 20:.1f} MiB'
+        _log(args, f'{result["stage"]}: {result["docs_per_sec"]:.0f} docs/s '
+                   f'({result["docs"]} docs in {result["seconds"]:.3f}s{peak})')
+
+    results = run_benchmarks(n_rows=args.rows, stages=args.stage, n_jobs=args.jobs, repeat=args.repeat,
+                             seed=args.seed, memory=not args.no_memory, progress=report)
+    if args.output:
+        save_results(results, args.output)
+        _log(args, f'results -> {args.output}')
+    if args.baseline:
+        print(compare_results(load_results(args.baseline), results).round(3).to_string())
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='sentiment-analyzer',
+                                     description='Batch sentiment analysis without the Streamlit UI.')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no progress on stderr')
+    parser.add_argument('--profile', action='store_true', help='print cProfile stats on stderr')
+    parser.add_argument('--metrics', help='append per-stage timings as one JSON line to this file '
+                                          '(default: $SENTIMENT_METRICS_FILE)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, func, help, output=True):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('input', help='input csv file')
+        if output:
+            command.add_argument('output', help='output file (.csv, .csv.gz, .csv.zst, .parquet, .arrow)')
+            command.add_argument('--format', choices=list(EXPORT_FORMATS),
+                                 help='output format (default: from the output file name)')
+        command.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                             help='rows read per chunk (default: %(default)s)')
+        command.add_argument('--jobs', type=int, default=None,
+                             help='worker processes (default: all cores)')
+        command.set_defaults(func=func)
+        return command
+
+    command = add_command('clean', cmd_clean, 'normalize the Review column')
+    command.add_argument('--with-sentiment', action='store_true',
+                         help='keep the sentiment column (input for the supervised models)')
+    add_command('textblob', cmd_textblob, 'TextBlob polarity/subjectivity of Clean Review')
+    add_command('vader', cmd_vader, 'VADER compound score of Review')
+    add_command('score', cmd_score, 'clean + TextBlob + VADER of Review, each distinct review scored once')
+
+    command = add_command('train', cmd_train, 'train and evaluate a supervised model', output=False)
+    command.add_argument('--vectorizer', choices=sorted(VECTORIZERS), default='tfidf')
+    command.add_argument('--classifier', choices=sorted(CLASSIFIERS), default='lr')
+    command.add_argument('--train-rows', type=int, default=35000)
+    command.add_argument('--split', choices=['head', 'ratio', 'stratified'], default='head')
+    command.add_argument('--test-size', type=float, default=0.3)
+    command.add_argument('--tuned', action='store_true', help='use the best configuration found by `tune`')
+
+    command = add_command('evaluate', cmd_evaluate, 'cross-validate a supervised model', output=False)
+    command.add_argument('--vectorizer', choices=sorted(VECTORIZERS), default='tfidf')
+    command.add_argument('--classifier', choices=sorted(CLASSIFIERS), default='lr')
+    command.add_argument('--split', choices=SPLIT_STRATEGIES, default='stratified-kfold')
+    command.add_argument('--folds', type=int, default=5)
+    command.add_argument('--test-size', type=float, default=0.3)
+
+    command = add_command('tune', cmd_tune, 'successive-halving hyperparameter search', output=False)
+    command.add_argument('--vectorizer', action='append', choices=['bow', 'tfidf'], help='repeatable (default: all)')
+    command.add_argument('--classifier', action='append', choices=sorted(CLASSIFIERS), help='repeatable (default: all)')
+    command.add_argument('--budget', type=float, default=600, help='wall-clock seconds (default: %(default)s)')
+    command.add_argument('--eta', type=int, default=3, help='keep 1/eta candidates per rung')
+    command.add_argument('--min-rows', type=int, default=2000, help='training rows in the first rung')
+
+    command = add_command('train-online', cmd_train_online,
+                          'update an incremental SVM with new labeled reviews', output=False)
+    command.add_argument('--name', default='svm', help='checkpoint name (default: %(default)s)')
+
+    command = add_command('features', cmd_features, 'vocabulary size and matrix bytes per vectorizer', output=False)
+    command.add_argument('--vectorizer', action='append', choices=sorted(VECTORIZERS),
+                         help='repeatable (default: tfidf and tfidf-compact)')
+    command.add_argument('--memmap', help='directory to store the feature matrices memory-mapped')
+
+    command = add_command('predict', cmd_predict, 'label a csv with a trained model, with confidence scores')
+    command.add_argument('--model', required=True, help='model key printed by `train`')
+    command.add_argument('--column', default='Clean Review', help='text column (default: %(default)s)')
+    command.add_argument('--clean', action=argparse.BooleanOptionalAction, default=None,
+                         help='run the text cleaner first (default: unless the column is Clean Review)')
+    command.add_argument('--keep', action='append', default=[], help='extra input column to copy (repeatable)')
+    command.add_argument('--threads', type=int, default=2, help='chunks scored concurrently (default: %(default)s)')
+    command.add_argument('--labels', metavar='COLUMN',
+                         help='true label column: also report accuracy, precision, recall and F1')
+
+    command = commands.add_parser('startup-check', help='time the imports the Home page needs')
+    command.add_argument('--budget', type=float, default=1.0, help='seconds (default: %(default)s)')
+    command.set_defaults(func=cmd_startup_check)
+
+    command = commands.add_parser('bench', help='throughput and peak memory of each stage on a synthetic corpus')
+    command.add_argument('--rows', type=int, default=10000, help='synthetic reviews (default: %(default)s)')
+    command.add_argument('--stage', action='append', choices=sorted(STAGES),
+                         help='repeatable (default: all but train:gbc and train:rfc)')
+    command.add_argument('--jobs', type=int, default=None,
+                         help='worker processes, 1 for serial (default: all cores)')
+    command.add_argument('--repeat', type=int, default=3, help='timed runs per stage, the best is kept')
+    command.add_argument('--seed', type=int, default=0)
+    command.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory pass')
+    command.add_argument('--output', help='write the results as JSON')
+    command.add_argument('--baseline', help='JSON from an earlier run to compare against')
+    command.set_defaults(func=cmd_bench)
+
+    command = commands.add_parser('serve', help='HTTP prediction service (VADER, TextBlob, trained models)')
+    command.add_argument('--model', action='append', default=[], help='model key to load (repeatable)')
+    command.add_argument('--host', default='127.0.0.1')
+    command.add_argument('--port', type=int, default=8000)
+    command.add_argument('--max-batch', type=int, default=512, help='texts per coalesced batch')
+    command.add_argument('--max-wait-ms', type=float, default=2.0, help='how long a batch waits to fill')
+    command.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    from sentiment_analyzer.instrument import finish_run, start_run
+
+    args = build_parser().parse_args(argv)
+    trace = start_run(args.command, profile=args.profile)
+    try:
+        return args.func(args)
+    finally:
+        finish_run(trace, metrics_file=args.metrics)
+        if args.profile:
+            print(trace.profile_stats(), file=sys.stderr)
+        for record in trace.records.values():
+            _log(args, f'  {"  " * record.depth}{record.name.rsplit("/", 1)[-1]}: '
+                       f'{record.seconds:.3f}s, {record.rows} rows, {record.calls} calls')
@@ -0,0 +1,81 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from sentiment_analyzer.models import make_classifier, make_vectorizer
+from sentiment_analyzer.pipeline import score_predictions
+from sentiment_analyzer.registry import fingerprint_data, get_default_registry
+
+
+######################### compare all supervised models on one feature extraction
+
+# the original feature sets and classifiers; the compact vectorizers and the fast
+# ensembles are compared only when asked for by name
+DEFAULT_VECTORIZERS = ['tfidf', 'bow']
+DEFAULT_CLASSIFIERS = ['lr', 'svm', 'gbc', 'rfc']
+
+def _fit_classifier(classifier_name, train_features, train_labels):
+    classifier = make_classifier(classifier_name)
+    start = time.perf_counter()
+    classifier.fit(train_features, train_labels)
+    return classifier, time.perf_counter() - start
+
+
+def compare_all_models(train_reviews, train_labels, test_reviews, test_labels,
+                       vectorizer_names=None, classifier_names=None,
+                       n_jobs=None, registry=None):
+    # Each vectorizer is fit once and its sparse train/test matrices are shared by every
+    # classifier. Classifiers train on a thread pool: the sklearn solvers spend most of
+    # their time in native code, and threads avoid pickling the feature matrices.
+    # Pairs already in the model registry are loaded instead of refit; the registry keeps
+    # one copy of each fitted vectorizer for all of its classifiers.
+    vectorizer_names = list(vectorizer_names or DEFAULT_VECTORIZERS)
+    classifier_names = list(classifier_names or DEFAULT_CLASSIFIERS)
+    registry = registry or get_default_registry()
+    n_jobs = n_jobs or min(len(classifier_names), os.cpu_count() or 1)
+    data_fingerprint = fingerprint_data(train_reviews, train_labels)
+
+    rows = []
+    for vectorizer_name in vectorizer_names:
+        keys = {name: registry.key_for(vectorizer_name, name, train_reviews, train_labels,
+                                       data_fingerprint=data_fingerprint)
+                for name in classifier_names}
+        vectorizer_key = registry.vectorizer_key_for(vectorizer_name, data_fingerprint)
+        entries = {name: registry.load(key) for name, key in keys.items()}
+        missing = [name for name, entry in entries.items() if entry is None]
+
+        start = time.perf_counter()
+        if missing:
+            vectorizer = make_vectorizer(vectorizer_name)
+            train_features = vectorizer.fit_transform(train_reviews)
+        else:
+            vectorizer = entries[classifier_names[0]]['vectorizer']
+        test_features = vectorizer.transform(test_reviews)
+        vectorize_seconds = time.perf_counter() - start
+
+        fitted = {name: (entries[name]['classifier'], 0.0)
+                  for name in classifier_names if name not in missing}
+        if missing:
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                futures = {name: pool.submit(_fit_classifier, name, train_features, train_labels)
+                           for name in missing}
+                for name, future in futures.items():
+                    classifier, fit_seconds = future.result()
+                    registry.save(keys[name], vectorizer, classifier, vectorizer_key=vectorizer_key,
+                                  meta={'vectorizer': vectorizer_name, 'classifier': name,
+                                        'n_train': len(train_reviews),
+                                        'n_features': train_features.shape[1]})
+                    fitted[name] = (classifier, fit_seconds)
+
+        for name in classifier_names:
+            classifier, fit_seconds = fitted[name]
+            predictions = classifier.predict(test_features)
+            rows.append({'classifier': name, 'vectorizer': vectorizer_name,
+                         **score_predictions(test_labels, predictions),
+                         'fit_seconds': fit_seconds, 'vectorize_seconds': vectorize_seconds,
+                         'cached': name not in missing})
+
+    results = pd.DataFrame(rows).set_index(['classifier', 'vectorizer'])
+    return results.round({'accuracy': 4, 'precision': 4, 'recall': 4, 'f1': 4})
@@ -0,0 +1,354 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.cache import get_cache_dir
+
+
+######################### columnar store for a scored corpus
+
+# One directory per corpus:
+#   meta.json                 row count, columns, label categories, histograms, quantiles
+#   <score>.f32               float32 per row (memory-mapped on open)
+#   <label>.codes             int8 category code per row, -1 for missing
+#   text.bin / text.offsets   utf-8 text of every row, int64 start offsets (n_rows + 1)
+#   postings.i32 / token.offsets / tokens.txt
+#                             token -> sorted row ids (inverted index)
+
+SCORE_COLUMNS = ['polarity', 'subjectivity', 'compound', 'confidence']
+LABEL_COLUMNS = ['sentiment', 'textblob_sentiment', 'vader_sentiment', 'prediction']
+HISTOGRAM_BINS = 40
+DEFAULT_MAX_BYTES = 1024 * 2 ** 20
+STALE_BUILD_SECONDS = 24 * 3600
+QUANTILES = [0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0]
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def index_dir(name):
+    return get_cache_dir('indexes', name)
+
+
+def tokenize_rows(texts):
+    # Distinct lowercase word tokens per row, as (tokens, rows) pairs.
+    tokens = pd.Series(texts, dtype=object).fillna('').str.lower().str.findall(_TOKEN).explode().dropna()
+    pairs = pd.DataFrame({'token': tokens.to_numpy(), 'row': tokens.index.to_numpy()}).drop_duplicates()
+    return pairs['token'].to_numpy(), pairs['row'].to_numpy()
+
+
+class IndexBuilder:
+    # Appends scored chunks to a new index directory, one chunk at a time, so building
+    # costs no more memory than the chunk plus the token -> rows pairs.
+
+    def __init__(self, path, text_column, score_columns=None, label_columns=None):
+        self.path = path
+        # unique per build: two sessions indexing the same upload never share a directory
+        self.tmp_path = tempfile.mkdtemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp',
+                                         dir=os.path.dirname(path))
+        self.text_column = text_column
+        self.score_columns = score_columns
+        self.label_columns = label_columns
+        self.categories = {}
+        self.n_rows = 0
+        self._offsets = [np.zeros(1, dtype=np.int64)]
+        self._text_bytes = 0
+        self._token_ids = {}
+        self._token_parts = []
+        self._row_parts = []
+        self._files = {}
+
+    def _file(self, name):
+        if name not in self._files:
+            self._files[name] = open(os.path.join(self.tmp_path, name), 'wb')
+        return self._files[name]
+
+    def add(self, df):
+        if self.score_columns is None:
+            self.score_columns = [c for c in SCORE_COLUMNS if c in df.columns]
+            self.label_columns = [c for c in LABEL_COLUMNS if c in df.columns]
+        for column in self.score_columns:
+            df[column].to_numpy(dtype=np.float32, na_value=np.nan).tofile(self._file(f'{column}.f32'))
+        for column in self.label_columns:
+            categories = self.categories.setdefault(column, [])
+            values = df[column].astype(object)
+            known = set(categories)
+            categories.extend(sorted(v for v in values.dropna().unique() if v not in known))
+            if len(categories) > 127:
+                raise ValueError(f'{column!r} has more than 127 distinct labels')
+            codes = pd.Categorical(values, categories=categories).codes.astype(np.int8)
+            codes.tofile(self._file(f'{column}.codes'))
+
+        texts = df[self.text_column].fillna('').astype(str).to_numpy()
+        encoded = [text.encode('utf-8') for text in texts]
+        self._file('text.bin').write(b''.join(encoded))
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        self._offsets.append(self._text_bytes + np.cumsum(lengths))
+        self._text_bytes += int(lengths.sum())
+
+        tokens, rows = tokenize_rows(texts)
+        codes, uniques = pd.factorize(tokens)
+        ids = np.array([self._token_ids.setdefault(token, len(self._token_ids)) for token in uniques],
+                       dtype=np.int64)
+        self._token_parts.append(ids[codes] if len(codes) else np.empty(0, dtype=np.int64))
+        self._row_parts.append((rows + self.n_rows).astype(np.int32))
+        self.n_rows += len(df)
+
+    def finish(self, source=None):
+        for f in self._files.values():
+            f.close()
+        np.concatenate(self._offsets).tofile(os.path.join(self.tmp_path, 'text.offsets'))
+
+        token_ids = np.concatenate(self._token_parts) if self._token_parts else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(self._row_parts) if self._row_parts else np.empty(0, dtype=np.int32)
+        # rows were appended in order, so a stable sort by token keeps each posting list sorted
+        order = np.argsort(token_ids, kind='stable')
+        rows[order].tofile(os.path.join(self.tmp_path, 'postings.i32'))
+        counts = np.bincount(token_ids, minlength=len(self._token_ids))
+        np.concatenate([[0], np.cumsum(counts)]).astype(np.int64).tofile(os.path.join(self.tmp_path, 'token.offsets'))
+        with open(os.path.join(self.tmp_path, 'tokens.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self._token_ids))
+
+        meta = {'n_rows': self.n_rows, 'text_column': self.text_column, 'score_columns': self.score_columns,
+                'label_columns': self.label_columns, 'categories': self.categories, 'source': source,
+                'created': time.time(), 'histograms': {}, 'quantiles': {}, 'label_counts': {}}
+        for column in self.score_columns:
+            values = np.fromfile(os.path.join(self.tmp_path, f'{column}.f32'), dtype=np.float32)
+            meta['histograms'][column] = _histogram(values, HISTOGRAM_BINS)
+            meta['quantiles'][column] = dict(zip(map(str, QUANTILES), _quantiles(values)))
+        for column in self.label_columns:
+            codes = np.fromfile(os.path.join(self.tmp_path, f'{column}.codes'), dtype=np.int8)
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+            meta['label_counts'][column] = dict(zip(self.categories[column], counts.tolist()))
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        _swap_in(self.tmp_path, self.path)
+        evict_indexes(keep=os.path.basename(self.path))
+        return SentimentIndex(self.path)
+
+
+def _swap_in(new_path, path):
+    # Moves the live index aside and the new one in its place, then deletes the old one.
+    # Sessions that already opened the old index keep reading it through their memory
+    # maps; one opening it between the two renames finds nothing and rebuilds. When two
+    # builds of the same index finish together, the last one wins.
+    old_path = f'{new_path}.old'
+    for attempt in range(10):
+        try:
+            os.replace(path, old_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(new_path, path)
+            break
+        except OSError:
+            # another build was swapped in after we moved the live index aside
+            if attempt == 9 or not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+def _histogram(values, bins):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def _quantiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return [None] * len(QUANTILES)
+    return np.quantile(values, QUANTILES).tolist()
+
+
+class SentimentIndex:
+    # Read side: every column is memory-mapped, so opening is instant and a query only
+    # pages in the postings and columns it touches.
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.n_rows = self.meta['n_rows']
+        self._scores = {c: self._map(f'{c}.f32', np.float32) for c in self.meta['score_columns']}
+        self._labels = {c: self._map(f'{c}.codes', np.int8) for c in self.meta['label_columns']}
+        self._text = self._map('text.bin', np.uint8)
+        self._text_offsets = self._map('text.offsets', np.int64)
+        self._postings = self._map('postings.i32', np.int32)
+        self._token_offsets = self._map('token.offsets', np.int64)
+        with open(os.path.join(path, 'tokens.txt'), encoding='utf-8') as f:
+            tokens = f.read()
+        self._tokens = {token: i for i, token in enumerate(tokens.split('\n'))} if tokens else {}
+
+    def _map(self, name, dtype):
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    @property
+    def score_columns(self):
+        return self.meta['score_columns']
+
+    @property
+    def label_columns(self):
+        return self.meta['label_columns']
+
+    def categories(self, column):
+        return self.meta['categories'][column]
+
+    def rows_with_token(self, token):
+        token_id = self._tokens.get(token.lower())
+        if token_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self._postings[self._token_offsets[token_id]:self._token_offsets[token_id + 1]]
+
+    def filter(self, labels=None, contains=None, score_ranges=None):
+        # Row ids (sorted) matching every condition:
+        #   labels        {label column: label or list of labels}
+        #   contains      word or list of words that must all occur (case-insensitive)
+        #   score_ranges  {score column: (low, high)}, inclusive
+        rows = None
+        if contains:
+            words = [contains] if isinstance(contains, str) else contains
+            for word in sorted(words, key=lambda w: len(self.rows_with_token(w))):
+                postings = self.rows_with_token(word)
+                rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+                if not len(rows):
+                    break
+        mask = None
+        for column, wanted in (labels or {}).items():
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            codes = [self.categories(column).index(v) for v in wanted if v in self.categories(column)]
+            values = self._labels[column] if rows is None else self._labels[column][rows]
+            mask = _and(mask, np.isin(values, codes))
+        for column, (low, high) in (score_ranges or {}).items():
+            values = self._scores[column] if rows is None else self._scores[column][rows]
+            mask = _and(mask, (values >= low) & (values <= high))
+        if rows is None:
+            return np.flatnonzero(mask) if mask is not None else np.arange(self.n_rows)
+        return rows if mask is None else rows[mask]
+
+    def scores(self, column, rows=None):
+        return self._scores[column] if rows is None else self._scores[column][rows]
+
+    def label_counts(self, column, rows=None):
+        if rows is None:
+            counts = self.meta['label_counts'][column]
+            return pd.Series(counts, name=column, dtype='int64').sort_values(ascending=False)
+        codes = self._labels[column][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories(column)))
+        return pd.Series(counts, index=self.categories(column), name=column).sort_values(ascending=False)
+
+    def histogram(self, column, rows=None, bins=HISTOGRAM_BINS):
+        # (counts, edges); precomputed for the whole corpus
+        if rows is None and bins == HISTOGRAM_BINS:
+            hist = self.meta['histograms'][column]
+            return np.array(hist['counts']), np.array(hist['edges'])
+        values = self.scores(column, rows)
+        return np.histogram(values[~np.isnan(values)], bins=bins)
+
+    def quantiles(self, column):
+        return pd.Series(self.meta['quantiles'][column], name=column)
+
+    def texts(self, rows):
+        offsets = self._text_offsets
+        return [bytes(self._text[offsets[row]:offsets[row + 1]]).decode('utf-8') for row in rows]
+
+    def frame(self, rows, limit=100):
+        # The stored columns for the first `limit` of `rows`, for drill-down tables.
+        rows = np.asarray(rows)[:limit]
+        data = {self.meta['text_column']: self.texts(rows)}
+        for column in self.score_columns:
+            data[column] = self._scores[column][rows]
+        for column in self.label_columns:
+            categories = np.array(self.categories(column) + [None], dtype=object)
+            data[column] = categories[self._labels[column][rows]]
+        return pd.DataFrame(data, index=rows)
+
+
+def _and(mask, other):
+    return other if mask is None else mask & other
+
+
+def build_index(chunks, name, text_column, source=None):
+    # Builds (or rebuilds) the index `name` from scored chunks and returns it opened.
+    builder = None
+    for chunk in chunks:
+        if builder is None:
+            builder = IndexBuilder(index_dir(name), text_column)
+        builder.add(chunk)
+    if builder is None:
+        builder = IndexBuilder(index_dir(name), text_column, score_columns=[], label_columns=[])
+    return builder.finish(source=source)
+
+
+def open_index(name):
+    path = index_dir(name)
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    index = SentimentIndex(path)
+    try:
+        os.utime(meta_path)  # last use, for evict_indexes
+    except OSError:
+        pass
+    return index
+
+
+def _dir_size(path):
+    total = 0
+    for parent, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(parent, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict_indexes(max_bytes=None, keep=None):
+    # Deletes the least recently opened indexes (exports included) until the rest fit in
+    # max_bytes (SENTIMENT_INDEX_MAX_MB, default 1 GiB), plus builds abandoned more than
+    # a day ago. `keep` is never deleted. Returns the names that were deleted.
+    if max_bytes is None:
+        max_mb = os.environ.get('SENTIMENT_INDEX_MAX_MB')
+        max_bytes = int(float(max_mb) * 2 ** 20) if max_mb else DEFAULT_MAX_BYTES
+    root = get_cache_dir('indexes')
+    now = time.time()
+    indexes = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if name.endswith(('.tmp', '.tmp.old')):
+                if now - os.path.getmtime(path) > STALE_BUILD_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            used = os.path.getmtime(os.path.join(path, 'meta.json'))
+        except OSError:
+            continue
+        indexes.append((used, name, _dir_size(path)))
+    total = sum(size for _, _, size in indexes)
+    evicted = []
+    for _, name, size in sorted(indexes):
+        if total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        total -= size
+        evicted.append(name)
+    return evicted
+
+
+def list_indexes():
+    root = get_cache_dir('indexes')
+    return sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, 'meta.json')))
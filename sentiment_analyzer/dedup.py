@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.instrument import stage as timed
+
+
+######################### factorize -> score uniques -> scatter back
+
+def factorize_texts(texts):
+    # Returns (codes, uniques): uniques[codes] rebuilds the input. Missing values
+    # (NaN/None) get code -1, which scatter() maps to its trailing fill row.
+    texts = pd.Series(texts if isinstance(texts, pd.Series) else list(texts), dtype=object)
+    codes, uniques = pd.factorize(texts)
+    return codes, list(uniques)
+
+
+def scatter(unique_values, codes, fill=np.nan):
+    # unique_values[codes] with one extra row of `fill` for the -1 codes.
+    unique_values = np.asarray(unique_values)
+    pad_shape = (1,) + unique_values.shape[1:]
+    if fill is np.nan and unique_values.dtype.kind not in 'fc':
+        unique_values = unique_values.astype(object if unique_values.dtype.kind in 'OUS' else float)
+    padded = np.concatenate([unique_values, np.full(pad_shape, fill, dtype=unique_values.dtype)])
+    return padded[codes]
+
+
+def clean_key(doc):
+    # Reviews that differ only in letter case or runs of whitespace clean to the same text
+    # (normalize_document lowercases and splits on whitespace), so one of them is enough.
+    # Non-ASCII text is left alone: lowercasing can change its length and with it the
+    # capped punctuation substitution.
+    if isinstance(doc, str) and doc.isascii():
+        return ' '.join(doc.lower().split())
+    return doc
+
+
+class DedupStats:
+    # Running row/unique counts over a stream of chunks (thread-safe).
+
+    def __init__(self):
+        self.rows = 0
+        self.unique_reviews = 0
+        self.unique_clean = 0
+        self._lock = threading.Lock()
+
+    def add(self, rows, unique_reviews, unique_clean=0):
+        with self._lock:
+            self.rows += rows
+            self.unique_reviews += unique_reviews
+            self.unique_clean += unique_clean
+
+    @property
+    def ratio(self):
+        # rows per distinct review; 4.0 means 4x less scoring work than row by row
+        return self.rows / self.unique_reviews if self.unique_reviews else 1.0
+
+
+######################### cleaner, TextBlob and VADER over distinct reviews only
+
+def dedup_normalize(reviews, n_jobs=None):
+    # cached_normalize_corpus over the distinct clean_key()s; missing reviews clean to ''.
+    from sentiment_analyzer.cache import cached_normalize_corpus
+
+    reviews = pd.Series(reviews if isinstance(reviews, pd.Series) else list(reviews), dtype=object)
+    codes, representatives = factorize_texts(reviews.fillna('').map(clean_key))
+    # clean the first original review behind each key (identical output by construction)
+    first = np.full(len(representatives), -1)
+    first[codes[::-1]] = np.arange(len(codes))[::-1]
+    originals = reviews.fillna('').to_numpy()[first] if len(first) else np.array([], dtype=object)
+    cleaned = cached_normalize_corpus(list(originals), n_jobs=n_jobs)
+    return scatter(cleaned.astype(object), codes, fill='')
+
+
+def dedup_score(reviews, n_jobs=None, stats=None):
+    # Review -> Clean Review, TextBlob polarity/subjectivity of the clean text and VADER
+    # scores of the raw text, each computed once per distinct input and scattered back.
+    # Returns a DataFrame aligned with `reviews`; per-chunk counts go to `stats`.
+    from sentiment_analyzer.blob import score_textblob
+    from sentiment_analyzer.vader import score_vader
+
+    index = reviews.index if isinstance(reviews, pd.Series) else None
+    with timed('dedup', rows=len(reviews)):
+        codes, uniques = factorize_texts(reviews)
+    with timed('normalize_unique', rows=len(uniques)):
+        clean_uniques = dedup_normalize(uniques, n_jobs=n_jobs)
+    clean_codes, clean_texts = factorize_texts(clean_uniques)
+    with timed('textblob_unique', rows=len(clean_texts)):
+        blob = score_textblob(clean_texts, n_jobs=n_jobs).to_numpy()
+    with timed('vader_unique', rows=len(uniques)):
+        vader = score_vader(uniques, n_jobs=n_jobs)['compound'].to_numpy()
+    if stats is not None:
+        stats.add(len(codes), len(uniques), len(clean_texts))
+
+    blob_per_unique = scatter(blob, clean_codes)
+    frame = pd.DataFrame({
+        'Review': np.asarray(reviews, dtype=object),
+        'Clean Review': scatter(clean_uniques, codes, fill=''),
+        'polarity': scatter(blob_per_unique[:, 0], codes),
+        'subjectivity': scatter(blob_per_unique[:, 1], codes),
+        'compound': scatter(vader, codes),
+    })
+    if index is not None:
+        frame.index = index
+    return frame
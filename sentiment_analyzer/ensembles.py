@@ -0,0 +1,61 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_selection import chi2
+
+
+######################### dimensionality reduction in front of the tree ensembles
+
+class ChiSquareSelector(BaseEstimator, TransformerMixin):
+    # Keeps the k columns with the highest chi2 score against the labels (all of them
+    # when there are fewer than k). dense=True returns a float32 ndarray, which is what
+    # HistGradientBoostingClassifier needs.
+
+    def __init__(self, k=1000, dense=False):
+        self.k = k
+        self.dense = dense
+
+    def fit(self, X, y):
+        scores, _ = chi2(X, y)
+        scores = np.nan_to_num(scores)
+        k = min(self.k, X.shape[1])
+        self.columns_ = np.sort(np.argpartition(scores, -k)[-k:]) if k < X.shape[1] else np.arange(X.shape[1])
+        return self
+
+    def transform(self, X):
+        X = X[:, self.columns_]
+        if self.dense:
+            X = X.toarray() if hasattr(X, 'toarray') else np.asarray(X)
+            X = X.astype(np.float32, copy=False)
+        return X
+
+
+def make_reducer(reducer, k, dense):
+    if reducer == 'chi2':
+        return ChiSquareSelector(k=k, dense=dense)
+    if reducer == 'svd':
+        # dense output; n_components has to stay below the number of columns
+        from sklearn.decomposition import TruncatedSVD
+        return TruncatedSVD(n_components=k, random_state=42)
+    raise ValueError(f'unknown reducer {reducer!r}, expected chi2 or svd')
+
+
+######################### fast ensemble models (classifier factories for models.CLASSIFIERS)
+
+def make_fast_gbc(reducer='chi2', k=300, max_iter=100, learning_rate=0.1, random_state=42):
+    # Histogram-based boosting bins each feature once and grows trees on the bins with
+    # OpenMP threads, instead of GradientBoostingClassifier's single-threaded exact splits
+    # over hundreds of thousands of sparse columns.
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.pipeline import make_pipeline
+    return make_pipeline(make_reducer(reducer, k, dense=True),
+                         HistGradientBoostingClassifier(max_iter=max_iter, learning_rate=learning_rate,
+                                                        random_state=random_state))
+
+
+def make_fast_rfc(reducer='chi2', k=20000, n_estimators=100, n_jobs=-1, random_state=42):
+    # Same forest on a chi2-selected column subset, with every core building trees.
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import make_pipeline
+    return make_pipeline(make_reducer(reducer, k, dense=False),
+                         RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs,
+                                                random_state=random_state))
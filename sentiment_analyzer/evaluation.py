@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+
+######################### train/test splits
+
+TRAIN_ROWS = 35000
+SPLIT_STRATEGIES = ['head', 'ratio', 'stratified', 'kfold', 'stratified-kfold']
+
+
+def make_splits(labels, strategy='head', test_size=0.3, n_splits=5, train_rows=TRAIN_ROWS,
+                random_state=42):
+    # Returns a list of (train_index, test_index) pairs.
+    #   head              first train_rows rows train, the rest test (the app's original
+    #                     split); shrinks to a test_size holdout when that leaves no test rows
+    #   ratio             shuffled holdout of test_size
+    #   stratified        shuffled holdout of test_size keeping the label proportions
+    #   kfold             n_splits shuffled folds
+    #   stratified-kfold  n_splits folds keeping the label proportions
+    from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+
+    labels = np.asarray(labels)
+    index = np.arange(len(labels))
+    if strategy == 'head':
+        if train_rows >= len(labels):
+            train_rows = int(len(labels) * (1 - test_size))
+        return [(index[:train_rows], index[train_rows:])]
+    if strategy in ('ratio', 'stratified'):
+        stratify = labels if strategy == 'stratified' else None
+        train_index, test_index = train_test_split(index, test_size=test_size, stratify=stratify,
+                                                   random_state=random_state)
+        return [(train_index, test_index)]
+    if strategy == 'kfold':
+        return list(KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(index))
+    if strategy == 'stratified-kfold':
+        folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        return list(folds.split(index, labels))
+    raise ValueError(f'unknown split strategy {strategy!r}, expected one of {SPLIT_STRATEGIES}')
+
+
+######################### cross-validation, vectorizer fit inside each fold
+
+def _evaluate_fold(fold, vectorizer_name, classifier_name, reviews, labels, train_index, test_index):
+    from sentiment_analyzer.models import make_classifier, make_vectorizer
+    from sentiment_analyzer.pipeline import score_predictions
+    # vocabulary and idf come from the training rows only, as with the held-out split
+    vectorizer = make_vectorizer(vectorizer_name)
+    train_features = vectorizer.fit_transform(reviews[train_index])
+    classifier = make_classifier(classifier_name)
+    classifier.fit(train_features, labels[train_index])
+    predictions = classifier.predict(vectorizer.transform(reviews[test_index]))
+    return {'fold': fold, 'n_train': len(train_index), 'n_test': len(test_index),
+            **score_predictions(labels[test_index], predictions)}
+
+
+def cross_validate(reviews, labels, vectorizer_name, classifier_name, strategy='stratified-kfold',
+                   n_splits=5, test_size=0.3, n_jobs=None, random_state=42):
+    # Every fold fits its own vectorizer on its training rows, so test rows never shape
+    # the vocabulary or the idf weights they are scored with; folds run in parallel.
+    # Returns (per-fold DataFrame, summary DataFrame with mean and std per metric).
+    from joblib import Parallel, delayed
+
+    reviews = np.asarray(reviews, dtype=object)
+    labels = np.asarray(labels)
+    splits = make_splits(labels, strategy=strategy, test_size=test_size, n_splits=n_splits,
+                         random_state=random_state)
+
+    rows = Parallel(n_jobs=n_jobs or -1)(
+        delayed(_evaluate_fold)(fold, vectorizer_name, classifier_name, reviews, labels, train_index, test_index)
+        for fold, (train_index, test_index) in enumerate(splits))
+    folds = pd.DataFrame(rows).set_index('fold')
+    metric_columns = ['accuracy', 'precision', 'recall', 'f1']
+    summary = pd.DataFrame({'mean': folds[metric_columns].mean(),
+                            'std': folds[metric_columns].std(ddof=0)})
+    return folds, summary
+
+
+def format_summary(summary, digits=4):
+    return {metric: f'{row["mean"]:.{digits}f} ± {row["std"]:.{digits}f}'
+            for metric, row in summary.iterrows()}
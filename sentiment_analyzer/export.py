@@ -0,0 +1,116 @@
+import gzip
+import importlib.util
+import io
+
+
+######################### streaming export writers (one DataFrame chunk at a time)
+
+# format -> (file suffix, mime type, module it needs)
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv', None),
+    'csv.gz': ('.csv.gz', 'application/gzip', None),
+    'csv.zst': ('.csv.zst', 'application/zstd', 'zstandard'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file', 'pyarrow'),
+}
+
+
+def available_formats():
+    return [fmt for fmt, (_, _, module) in EXPORT_FORMATS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+def format_for_path(path, default='csv'):
+    # longest suffix first so '.csv.gz' wins over '.csv'
+    for fmt, (suffix, _, _) in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1][0])):
+        if str(path).endswith(suffix):
+            return fmt
+    return default
+
+
+class CsvWriter:
+    # Same layout as DataFrame.to_csv(): index kept, header written once.
+
+    def __init__(self, path, fmt='csv'):
+        self._raw = None
+        if fmt == 'csv':
+            self._text = open(path, 'w', newline='', encoding='utf-8')
+        elif fmt == 'csv.gz':
+            self._text = gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        elif fmt == 'csv.zst':
+            import zstandard
+            self._raw = open(path, 'wb')
+            self._text = io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(self._raw),
+                                          encoding='utf-8', newline='')
+        else:
+            raise ValueError(f'not a csv format: {fmt!r}')
+        self._header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self._text, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._text.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+
+
+def _promote_empty_columns(schema, table):
+    # A text column that is empty throughout the first chunk comes out of read_csv as
+    # all-NaN float64 (or as Arrow's null type), and a later chunk with text in it could
+    # not be cast to that. Such columns are written as strings; numbers in later chunks
+    # cast to string fine, the reverse does not.
+    import pyarrow as pa
+    for i, field in enumerate(schema):
+        column = table.column(i)
+        if pa.types.is_null(field.type) or (len(column) and column.null_count == len(column)):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+class ArrowWriter:
+    # Parquet row groups / Arrow record batches, one per chunk. The schema is taken from
+    # the first chunk, with columns that are entirely empty there stored as strings; the
+    # index is stored as a column like the CSV export does.
+
+    def __init__(self, path, fmt='parquet'):
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+        table = pa.Table.from_pandas(chunk, preserve_index=True)
+        if self._writer is None:
+            self._schema = _promote_empty_columns(table.schema, table)
+            if self.fmt == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression='zstd')
+            else:
+                import pyarrow.ipc
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        table = table.cast(self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path, fmt=None):
+    fmt = fmt or format_for_path(path)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'unknown export format {fmt!r}, expected one of {list(EXPORT_FORMATS)}')
+    if fmt in ('parquet', 'arrow'):
+        return ArrowWriter(path, fmt)
+    return CsvWriter(path, fmt)
+
+
+def export_file_name(filename, fmt):
+    return f'{filename}{EXPORT_FORMATS[fmt][0]}'
+
+
+def export_mime(fmt):
+    return EXPORT_FORMATS[fmt][1]
@@ -0,0 +1,112 @@
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+
+######################### compact feature extraction
+
+# The dict vocabulary behind TfidfVectorizer/CountVectorizer(ngram_range=(1, 2),
+# min_df=0.0) keeps every unigram and bigram ever seen, easily millions of entries.
+# The compact backends hash terms into a fixed number of float32 columns instead, so
+# there is no vocabulary to hold at all and the matrix is half the size of float64.
+# They still carry per-column arrays (document frequencies while fitting, a float32
+# idf_ in every saved compact TF-IDF model), so n_features is kept at 2**18 (1 MiB of
+# idf): small corpora with a few thousand terms gain nothing, and hashing can be
+# slower than the dict vocabulary. The win is peak memory once the vocabulary runs
+# into the hundreds of thousands of terms.
+
+COMPACT_FEATURES = 2 ** 18
+
+
+def make_compact_tfidf(n_features=COMPACT_FEATURES, ngram_range=(1, 2), sublinear_tf=True):
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+    return make_pipeline(
+        HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False,
+                          norm=None, dtype=np.float32),
+        TfidfTransformer(use_idf=True, sublinear_tf=sublinear_tf))
+
+
+def make_compact_bow(n_features=COMPACT_FEATURES, ngram_range=(1, 2)):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False,
+                             norm=None, dtype=np.float32)
+
+
+def vocabulary_size(vectorizer):
+    # number of stored terms; hashed backends keep none
+    vocabulary = getattr(vectorizer, 'vocabulary_', None)
+    return 0 if vocabulary is None else len(vocabulary)
+
+
+def n_output_features(vectorizer):
+    if hasattr(vectorizer, 'vocabulary_'):
+        return len(vectorizer.vocabulary_)
+    steps = getattr(vectorizer, 'steps', None)
+    first = steps[0][1] if steps else vectorizer
+    return first.n_features
+
+
+def matrix_bytes(matrix):
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+######################### memory-mapped CSR storage (the `features --memmap` command)
+
+def save_csr(matrix, directory):
+    os.makedirs(directory, exist_ok=True)
+    matrix = matrix.tocsr()
+    np.save(os.path.join(directory, 'data.npy'), matrix.data)
+    np.save(os.path.join(directory, 'indices.npy'), matrix.indices)
+    np.save(os.path.join(directory, 'indptr.npy'), matrix.indptr)
+    np.save(os.path.join(directory, 'shape.npy'), np.array(matrix.shape))
+
+
+def load_csr(directory, mmap_mode='r'):
+    # The arrays stay memory-mapped: only the pages a model touches get read in.
+    from scipy import sparse
+    data = np.load(os.path.join(directory, 'data.npy'), mmap_mode=mmap_mode)
+    indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode=mmap_mode)
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode=mmap_mode)
+    shape = tuple(np.load(os.path.join(directory, 'shape.npy')))
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+######################### extraction with a size report
+
+def extract_features(reviews, vectorizer_name, memmap_dir=None, trace_memory=False):
+    # Fits `vectorizer_name` (any key of models.VECTORIZERS) on reviews and returns
+    # (vectorizer, matrix, report). With memmap_dir the matrix is written there and the
+    # returned matrix is the memory-mapped copy.
+    from sentiment_analyzer.models import make_vectorizer
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    vectorizer = make_vectorizer(vectorizer_name)
+    matrix = vectorizer.fit_transform(reviews).tocsr()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    if memmap_dir is not None:
+        save_csr(matrix, memmap_dir)
+        matrix = load_csr(memmap_dir)
+
+    report = {
+        'vectorizer': vectorizer_name,
+        'shape': matrix.shape,
+        'nnz': int(matrix.nnz),
+        'dtype': str(matrix.dtype),
+        'vocabulary_size': vocabulary_size(vectorizer),
+        'matrix_bytes': matrix_bytes(matrix),
+        'fit_seconds': seconds,
+        'peak_bytes': peak,
+    }
+    return vectorizer, matrix, report
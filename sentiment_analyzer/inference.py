@@ -0,0 +1,102 @@
+import contextvars
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.dedup import dedup_normalize, factorize_texts, scatter
+from sentiment_analyzer.instrument import stage as timed
+from sentiment_analyzer.parallel import map_chunks
+
+
+######################### labels + confidence from a fitted classifier
+
+DEFAULT_CHUNK_SIZE = 20000
+DEFAULT_THREADS = 2
+
+
+def predict_with_confidence(classifier, features):
+    # One pass gives both the label and how sure the model is:
+    #   predict_proba (LR, GBC, RFC)       highest class probability
+    #   decision_function (SVM, hinge)     logistic of the margin; ranks like a probability
+    #                                      but is not calibrated
+    classes = classifier.classes_
+    if hasattr(classifier, 'predict_proba'):
+        proba = classifier.predict_proba(features)
+        best = proba.argmax(axis=1)
+        return classes[best], proba[np.arange(len(best)), best]
+    scores = classifier.decision_function(features)
+    if scores.ndim == 1:
+        return classes[(scores > 0).astype(np.intp)], 1 / (1 + np.exp(-np.abs(scores)))
+    best = scores.argmax(axis=1)
+    exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return classes[best], exp[np.arange(len(best)), best] / exp.sum(axis=1)
+
+
+def _load_model(model_key):
+    # the registry memoizes per process, so each pool worker reads the joblib file once
+    from sentiment_analyzer.registry import get_default_registry
+    entry = get_default_registry().load(model_key)
+    if entry is None:
+        raise KeyError(f'no model {model_key!r} in the registry')
+    return entry['vectorizer'], entry['classifier']
+
+
+def _transform_predict(model_key, texts):
+    from sentiment_analyzer.registry import get_default_registry
+    with get_default_registry().use(model_key) as entry:
+        if entry is None:
+            raise KeyError(f'no model {model_key!r} in the registry')
+        labels, confidence = predict_with_confidence(entry['classifier'], entry['vectorizer'].transform(texts))
+    return labels, confidence.astype(np.float32)
+
+
+def predict_texts(texts, model_key, clean=True, n_jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Returns a DataFrame with prediction/confidence per text (index kept for a Series).
+    # Each distinct text is cleaned and scored once. Tokenizing is what costs, so the
+    # distinct texts are spread over the shared process pool, where every worker loads
+    # the model from the registry a single time. Missing texts are scored as '', as in
+    # training (load_supervised_data), so every row gets a label.
+    index = texts.index if isinstance(texts, pd.Series) else None
+    texts = pd.Series(texts if isinstance(texts, pd.Series) else list(texts), dtype=object).fillna('')
+    codes, uniques = factorize_texts(texts)
+    if clean:
+        with timed('normalize_unique', rows=len(uniques)):
+            uniques = list(dedup_normalize(uniques, n_jobs=n_jobs))
+    _load_model(model_key)  # fail here, not in a worker, when the key is unknown
+    with timed('transform_predict', rows=len(uniques)):
+        parts = map_chunks(functools.partial(_transform_predict, model_key), uniques,
+                           n_jobs=n_jobs, chunk_size=chunk_size)
+    if parts:
+        labels = np.concatenate([part[0] for part in parts]).astype(object)
+        confidence = np.concatenate([part[1] for part in parts])
+    else:
+        labels, confidence = np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+    return pd.DataFrame({'prediction': scatter(labels, codes), 'confidence': scatter(confidence, codes)},
+                        index=index)
+
+
+def predict_chunk(df, model_key, column='Review', clean=True, n_jobs=None):
+    scores = predict_texts(df[column], model_key, clean=clean, n_jobs=n_jobs)
+    df = df.copy()
+    df['prediction'] = scores['prediction']
+    df['confidence'] = scores['confidence']
+    return df
+
+
+def predict_chunks(chunks, model_key, column='Review', clean=True, n_jobs=None, n_threads=DEFAULT_THREADS):
+    # Scores up to n_threads chunks at once and yields them in input order, so reading
+    # the next chunk and writing the previous one overlap with scoring. At most
+    # 2 * n_threads chunks are in flight.
+    score = functools.partial(predict_chunk, model_key=model_key, column=column, clean=clean, n_jobs=n_jobs)
+    with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix='sentiment-predict') as pool:
+        pending = deque()
+        for chunk in chunks:
+            # copy the context so stage timings land in the caller's run
+            pending.append(pool.submit(contextvars.copy_context().run, score, chunk))
+            if len(pending) >= 2 * n_threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,123 @@
+import os
+
+import pandas as pd
+
+from sentiment_analyzer.instrument import stage as timed
+
+
+######################### chunked csv ingestion
+
+DEFAULT_CHUNK_ROWS = 20000
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    try:
+        position = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _source_position(source):
+    try:
+        return source.tell()
+    except (AttributeError, OSError):
+        return None
+
+
+def iter_csv_chunks(source, usecols=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    # Only the requested columns are parsed; pandas raises if one of them is missing.
+    # The running RangeIndex carries over between chunks, same as a single read_csv.
+    # File objects are rewound first: Streamlit hands the same upload to every rerun.
+    if hasattr(source, 'seek'):
+        try:
+            source.seek(0)
+        except OSError:
+            pass
+    with pd.read_csv(source, usecols=usecols, chunksize=chunk_rows) as reader:
+        while True:
+            with timed('read_csv') as record:
+                chunk = next(reader, None)
+                record.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def _stage_name(func):
+    while hasattr(func, 'func'):  # functools.partial
+        func = func.func
+    return getattr(func, '__name__', 'stage')
+
+
+def stream_stage(source, stage, usecols=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    # Reads `source` chunk by chunk, applies `stage` to each chunk and yields the result,
+    # so at most one input chunk and one output chunk are alive at a time.
+    # progress(rows_done, fraction) is called after every chunk; fraction is estimated
+    # from the read position and is None when the size of the source is unknown.
+    if isinstance(source, (str, os.PathLike)):
+        # open paths ourselves so the read position can drive the progress fraction
+        with open(source, 'rb') as f:
+            yield from stream_stage(f, stage, usecols=usecols, chunk_rows=chunk_rows,
+                                    progress=progress)
+        return
+
+    total_bytes = _source_size(source)
+    rows_done = 0
+    stage_name = _stage_name(stage)
+    for chunk in iter_csv_chunks(source, usecols=usecols, chunk_rows=chunk_rows):
+        with timed(stage_name, rows=len(chunk)):
+            result = stage(chunk)
+        rows_done += len(chunk)
+        if progress is not None:
+            fraction = None
+            position = _source_position(source)
+            if total_bytes and position is not None:
+                fraction = min(position / total_bytes, 1.0)
+            progress(rows_done, fraction)
+        yield result
+
+
+def write_stream(chunks, out, fmt=None, head_rows=5, count_column=None):
+    # Writes the chunks to `out` one at a time (csv, csv.gz, csv.zst, parquet or arrow, see
+    # export.py; by default from the file suffix) and returns
+    # (head, value_counts of count_column or None, rows written).
+    from sentiment_analyzer.export import open_writer
+
+    head = None
+    counts = None
+    n_rows = 0
+    writer = open_writer(out, fmt)
+    try:
+        for chunk in chunks:
+            with timed('write', rows=len(chunk)):
+                writer.write(chunk)
+            if head is None or len(head) < head_rows:
+                head = chunk.head(head_rows) if head is None else pd.concat([head, chunk]).head(head_rows)
+            if count_column is not None:
+                chunk_counts = chunk[count_column].value_counts()
+                counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+            n_rows += len(chunk)
+    finally:
+        writer.close()
+    if counts is not None:
+        counts = counts.astype('int64').sort_values(ascending=False)
+        counts.name = count_column
+    return head, counts, n_rows
+
+
+def count_column_values(source, column, chunk_rows=DEFAULT_CHUNK_ROWS):
+    counts = None
+    for chunk in iter_csv_chunks(source, usecols=[column], chunk_rows=chunk_rows):
+        chunk_counts = chunk[column].value_counts()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    if counts is None:
+        return pd.Series(dtype='int64', name=column)
+    counts = counts.astype('int64').sort_values(ascending=False)
+    counts.name = column
+    return counts
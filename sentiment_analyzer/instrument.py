@@ -0,0 +1,218 @@
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+######################### memory sampling
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    # Resident set size of this process in bytes, None where /proc is not available.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def peak_rss():
+    # High-water mark of this process since it started (ru_maxrss is KiB on Linux, bytes on macOS).
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+######################### per-run stage timings
+
+class StageRecord:
+    # Totals for one stage within a run; a stage entered once per chunk adds up here.
+    # Nested stages are named by their path ('clean_chunk/normalize') and their time is
+    # also part of the parent's.
+
+    __slots__ = ('name', 'calls', 'seconds', 'rows', 'rss_delta', 'max_rss')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.rss_delta = 0
+        self.max_rss = None
+
+    @property
+    def depth(self):
+        return self.name.count('/')
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'depth': self.depth,
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'rows_per_sec': self.rows / self.seconds if self.rows and self.seconds else None,
+            'rss_delta_bytes': self.rss_delta,
+            'max_rss_bytes': self.max_rss,
+        }
+
+
+class RunTrace:
+    # Collects StageRecords for one run (one Streamlit rerun, one CLI command). With a
+    # profiler (anything with enable()/disable(), e.g. cProfile.Profile) the whole run is
+    # profiled between start() and finish().
+
+    def __init__(self, name, profiler=None):
+        self.name = name
+        self.profiler = profiler
+        self.records = {}
+        self.started = None
+        self.seconds = None
+        self._t0 = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.seconds = time.perf_counter() - self._t0
+        return self
+
+    def record(self, name):
+        # Records are kept in the order stages were first entered, so parents precede children.
+        with self._lock:
+            record = self.records.get(name)
+            if record is None:
+                record = self.records[name] = StageRecord(name)
+            return record
+
+    def add(self, name, seconds, rows=0, rss_delta=0, rss=None):
+        record = self.record(name)
+        with self._lock:
+            record.calls += 1
+            record.seconds += seconds
+            record.rows += rows or 0
+            record.rss_delta += rss_delta or 0
+            if rss is not None:
+                record.max_rss = max(record.max_rss or 0, rss)
+
+    def profile_stats(self, limit=30, sort='cumulative'):
+        if not isinstance(self.profiler, cProfile.Profile):
+            return None
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def as_dict(self):
+        return {
+            'run': self.name,
+            'started': self.started,
+            'seconds': self.seconds,
+            'peak_rss_bytes': peak_rss(),  # process lifetime, not just this run
+            'stages': [record.as_dict() for record in self.records.values()],
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def to_prometheus(self, prefix='sentiment_analyzer'):
+        # Prometheus text exposition format, for a textfile collector or a push gateway.
+        lines = []
+        for metric, field, kind in [('stage_seconds_total', 'seconds', 'counter'),
+                                    ('stage_rows_total', 'rows', 'counter'),
+                                    ('stage_calls_total', 'calls', 'counter'),
+                                    ('stage_rss_delta_bytes', 'rss_delta', 'gauge')]:
+            lines.append(f'# TYPE {prefix}_{metric} {kind}')
+            for record in self.records.values():
+                lines.append(f'{prefix}_{metric}{{run="{self.name}",stage="{record.name}"}} '
+                             f'{getattr(record, field)}')
+        if self.seconds is not None:
+            lines.append(f'# TYPE {prefix}_run_seconds gauge')
+            lines.append(f'{prefix}_run_seconds{{run="{self.name}"}} {self.seconds}')
+        return '\n'.join(lines) + '\n'
+
+
+_current = contextvars.ContextVar('sentiment_analyzer_trace', default=None)
+_parent = contextvars.ContextVar('sentiment_analyzer_stage', default=None)
+
+
+def start_run(name, profile=False):
+    # Makes a new RunTrace the current one for this thread/context. profile=True attaches
+    # cProfile; any object with enable()/disable() can be passed instead (a sampling profiler).
+    profiler = cProfile.Profile() if profile is True else (profile or None)
+    trace = RunTrace(name, profiler=profiler).start()
+    _current.set(trace)
+    _parent.set(None)
+    return trace
+
+
+def finish_run(trace, metrics_file=None):
+    # Stops the trace, appends it as one JSON line to metrics_file (default: the
+    # SENTIMENT_METRICS_FILE environment variable, if set) and returns it.
+    trace.finish()
+    if _current.get() is trace:
+        _current.set(None)
+    metrics_file = metrics_file or os.environ.get('SENTIMENT_METRICS_FILE')
+    if metrics_file:
+        with open(metrics_file, 'a') as f:
+            f.write(trace.to_json() + '\n')
+    return trace
+
+
+def current_run():
+    return _current.get()
+
+
+class _Stage:
+    __slots__ = ('rows',)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    # Times the block into the current run, if any; otherwise costs one ContextVar lookup.
+    # The row count can be set up front or, once known, on the yielded object:
+    #     with stage('read_csv') as s:
+    #         df = ...
+    #         s.rows = len(df)
+    trace = _current.get()
+    record = _Stage(rows)
+    if trace is None:
+        yield record
+        return
+    parent = _parent.get()
+    path = name if parent is None else f'{parent}/{name}'
+    token = _parent.set(path)
+    trace.record(path)
+    rss_before = current_rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        _parent.reset(token)
+        rss_after = current_rss()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        trace.add(path, seconds, rows=record.rows, rss_delta=rss_delta, rss=rss_after)
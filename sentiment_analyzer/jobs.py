@@ -0,0 +1,264 @@
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+from sentiment_analyzer.cache import get_cache_dir
+from sentiment_analyzer.instrument import finish_run, start_run
+from sentiment_analyzer.startup import CLEAN_RESOURCES, ensure_nltk_resources
+
+
+######################### job kinds: data (csv bytes) + params -> picklable result
+
+def train_job(data, progress, vectorizer_name, classifier_name, split='head'):
+    from sentiment_analyzer.pipeline import classification_report_frame, load_supervised_data, train_and_evaluate
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    progress(0.05, 'reading and cleaning reviews')
+    train_reviews, train_labels, test_reviews, test_labels = load_supervised_data(io.BytesIO(data), strategy=split)
+    progress(0.4, f'training {classifier_name} on {len(train_reviews)} reviews')
+    result = train_and_evaluate(vectorizer_name, classifier_name, train_reviews, train_labels,
+                                test_reviews, test_labels)
+    progress(0.95, 'scoring')
+    return {
+        'vectorizer_name': vectorizer_name,
+        'classifier_name': classifier_name,
+        'from_cache': result['from_cache'],
+        'key': result['key'],
+        'train_shape': result['train_shape'],
+        'test_shape': result['test_shape'],
+        'test_labels': test_labels,
+        'predictions': result['predictions'],
+        'confusion': result['confusion'],
+        'metrics': result['metrics'],
+        'report': classification_report_frame(test_labels, result['predictions'], matrix=result['confusion']),
+    }
+
+
+def compare_job(data, progress, split='head', vectorizer_names=None, classifier_names=None):
+    from sentiment_analyzer.compare import compare_all_models
+    from sentiment_analyzer.pipeline import load_supervised_data
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    progress(0.05, 'reading and cleaning reviews')
+    train_reviews, train_labels, test_reviews, test_labels = load_supervised_data(io.BytesIO(data), strategy=split)
+    progress(0.3, 'training models')
+    return compare_all_models(train_reviews, train_labels, test_reviews, test_labels,
+                              vectorizer_names=vectorizer_names, classifier_names=classifier_names)
+
+
+def cross_validate_job(data, progress, vectorizer_name, classifier_name, strategy='stratified-kfold', n_splits=5):
+    from sentiment_analyzer.cache import cached_normalize_corpus
+    from sentiment_analyzer.evaluation import cross_validate
+    from sentiment_analyzer.pipeline import read_labeled_reviews
+
+    ensure_nltk_resources(CLEAN_RESOURCES)
+    progress(0.05, 'reading and cleaning reviews')
+    reviews, labels = read_labeled_reviews(io.BytesIO(data))
+    reviews = cached_normalize_corpus(reviews)
+    progress(0.3, f'{n_splits} folds')
+    folds, summary = cross_validate(reviews, labels, vectorizer_name, classifier_name,
+                                    strategy=strategy, n_splits=n_splits)
+    return {'folds': folds, 'summary': summary}
+
+
+JOB_KINDS = {
+    'train': train_job,
+    'compare': compare_job,
+    'cross-validate': cross_validate_job,
+}
+
+
+######################### jobs
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+
+class Job:
+    # Status of one submission. Fields are only written by the worker running it, so
+    # readers (any Streamlit session) can poll them without locking.
+
+    def __init__(self, job_id, kind, params, path):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.path = path
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = 'waiting for a worker'
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.timings = None
+        self._result = None
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+    def report(self, fraction, message=None):
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def result(self):
+        # Loaded from disk on first access when the job finished in an earlier process.
+        if self.state != DONE:
+            return None
+        if self._result is None:
+            try:
+                self._result = joblib.load(self.path)
+                os.utime(self.path)  # last use, for JobQueue.evict_results
+            except FileNotFoundError:
+                # evicted since: failed jobs are run again on the next submit
+                self.state, self.error, self.message = FAILED, 'result was evicted', 'failed'
+                return None
+        return self._result
+
+    def as_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'params': self.params, 'state': self.state,
+                'progress': self.progress, 'message': self.message, 'error': self.error,
+                'submitted': self.submitted, 'started': self.started, 'finished': self.finished}
+
+
+def job_id_for(kind, data, params):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(kind.encode())
+    h.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    h.update(hashlib.blake2b(data, digest_size=20).digest())
+    return h.hexdigest()
+
+
+class JobQueue:
+    # A worker pool shared by every session of the app. Identical submissions (same kind,
+    # params and csv bytes) map to one job id, so they attach to the job already queued
+    # or running, or to its persisted result, instead of training again. At most
+    # max_queued jobs may wait for a worker; past that submit() raises queue.Full.
+    # Persisted results are kept under max_bytes (SENTIMENT_JOBS_MAX_MB, default 512 MiB),
+    # least recently used deleted first.
+
+    def __init__(self, root=None, max_workers=2, max_queued=16, keep_finished=256, max_bytes=None):
+        if max_bytes is None:
+            max_mb = os.environ.get('SENTIMENT_JOBS_MAX_MB')
+            max_bytes = int(float(max_mb) * 2 ** 20) if max_mb else DEFAULT_MAX_BYTES
+        self.root = root or get_cache_dir('jobs')
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sentiment-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, job_id):
+        return os.path.join(self.root, f'{job_id}.joblib')
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending(self):
+        with self._lock:
+            return sum(job.state == QUEUED for job in self._jobs.values())
+
+    def submit(self, kind, data, **params):
+        func = JOB_KINDS[kind]
+        job_id = job_id_for(kind, data, params)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.state != FAILED:
+                return job
+            job = Job(job_id, kind, params, self.path_for(job_id))
+            if os.path.exists(job.path):
+                job.state, job.progress, job.message = DONE, 1.0, 'finished earlier'
+                try:
+                    os.utime(job.path)
+                except OSError:
+                    pass
+                self._remember(job)
+                return job
+            if sum(other.state == QUEUED for other in self._jobs.values()) >= self.max_queued:
+                raise queue.Full(f'{self.max_queued} jobs are already waiting, try again later')
+            self._remember(job)
+        self._executor.submit(self._run, job, func, data)
+        return job
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        finished = [old for old in self._jobs.values() if old.done]
+        for old in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[old.id]
+
+    def _run(self, job, func, data):
+        job.state, job.started, job.message = RUNNING, time.time(), 'starting'
+        trace = start_run(f'job:{job.kind}')
+        try:
+            result = func(data, job.report, **job.params)
+            tmp_path = f'{job.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            joblib.dump(result, tmp_path)
+            os.replace(tmp_path, job.path)
+            job._result = result
+            self.evict_results(keep=job.path)
+            job.timings = finish_run(trace).as_dict()
+            job.finished = time.time()
+            job.state, job.progress, job.message = DONE, 1.0, 'done'
+        except Exception as exc:
+            job.timings = finish_run(trace).as_dict()
+            job.finished = time.time()
+            job.state, job.error, job.message = FAILED, f'{type(exc).__name__}: {exc}', 'failed'
+
+    def evict_results(self, keep=None):
+        # Deletes the least recently used result files until the rest fit in max_bytes;
+        # a job whose file is gone runs again when it is next submitted.
+        results = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.joblib'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            results.append((stat.st_mtime, path, stat.st_size))
+        total = sum(size for _, _, size in results)
+        evicted = []
+        for _, path, size in sorted(results):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted.append(path)
+        return evicted
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_default_queue():
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+######################### one confusion matrix -> every classification metric
+
+class ConfusionMatrix:
+    # Counts[true, predicted] over integer label codes, accumulated chunk by chunk.
+    # Labels are encoded once per chunk against `classes` (labels not seen before are
+    # appended), so a stream of millions of predictions costs one hash lookup per label
+    # and one bincount per chunk. update() may be called from several threads (encoding
+    # runs outside the lock); partial matrices from other processes combine with merge().
+    # Accuracy, precision, recall, F1 and the report are all derived from the matrix and
+    # match sklearn.metrics (weighted averages, zero_division=0).
+
+    def __init__(self, classes=None):
+        self.classes = list(classes or [])
+        self.counts = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # picklable for job results and pool workers; the lock is per process
+        return {'classes': self.classes, 'counts': self.counts}
+
+    def __setstate__(self, state):
+        self.classes = state['classes']
+        self.counts = state['counts']
+        self._lock = threading.Lock()
+
+    def _encode(self, labels):
+        labels = pd.Series(labels, dtype=object) if not isinstance(labels, pd.Series) else labels.astype(object)
+        codes = pd.Index(self.classes, dtype=object).get_indexer(labels)
+        if (codes < 0).any():
+            with self._lock:
+                known = set(self.classes)
+                self._grow(sorted({label for label in labels[codes < 0].unique() if label not in known}, key=str))
+            codes = pd.Index(self.classes, dtype=object).get_indexer(labels)
+        return codes
+
+    def _grow(self, new_classes):
+        if not new_classes:
+            return
+        self.classes.extend(new_classes)
+        n = len(self.classes)
+        counts = np.zeros((n, n), dtype=np.int64)
+        counts[:self.counts.shape[0], :self.counts.shape[1]] = self.counts
+        self.counts = counts
+
+    def update(self, true_labels, predicted_labels):
+        true_codes = self._encode(true_labels)
+        predicted_codes = self._encode(predicted_labels)
+        if len(true_codes) != len(predicted_codes):
+            raise ValueError(f'{len(true_codes)} true labels but {len(predicted_codes)} predictions')
+        with self._lock:
+            n = len(self.classes)
+            chunk = np.bincount(true_codes * n + predicted_codes, minlength=n * n).reshape(n, n)
+            self.counts += chunk
+        return self
+
+    def merge(self, other):
+        with self._lock:
+            self._grow([label for label in other.classes if label not in set(self.classes)])
+            order = pd.Index(self.classes, dtype=object).get_indexer(other.classes)
+            self.counts[np.ix_(order, order)] += other.counts
+        return self
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def _per_class(self, classes=None):
+        # (tp, predicted, support) for `classes` (default: every class seen)
+        index = np.arange(len(self.classes)) if classes is None else \
+            pd.Index(self.classes, dtype=object).get_indexer(list(classes))
+        diag = np.append(np.diag(self.counts), 0)
+        predicted = np.append(self.counts.sum(axis=0), 0)
+        support = np.append(self.counts.sum(axis=1), 0)
+        return diag[index], predicted[index], support[index]  # index -1 -> trailing zero
+
+    def precision_recall_f1(self, classes=None):
+        tp, predicted, support = self._per_class(classes)
+        precision = _divide(tp, predicted)
+        recall = _divide(tp, support)
+        f1 = _divide(2 * precision * recall, precision + recall)
+        return precision, recall, f1, support
+
+    def accuracy(self):
+        return float(np.trace(self.counts) / self.n) if self.n else 0.0
+
+    def scores(self):
+        # accuracy plus support-weighted precision/recall/F1 over every label seen
+        precision, recall, f1, support = self.precision_recall_f1()
+        total = support.sum()
+        weighted = (lambda values: float(values @ support / total)) if total else (lambda values: 0.0)
+        return {'accuracy': self.accuracy(), 'precision': weighted(precision),
+                'recall': weighted(recall), 'f1': weighted(f1)}
+
+    def report(self, classes=None):
+        # The classification_report(output_dict=True) table as a DataFrame: one row per
+        # class, then 'accuracy' ('micro avg' when `classes` leaves some labels out),
+        # 'macro avg' and 'weighted avg'.
+        classes = self.classes if classes is None else list(classes)
+        precision, recall, f1, support = self.precision_recall_f1(classes)
+        rows = {label: [p, r, f, s] for label, p, r, f, s in zip(classes, precision, recall, f1, support)}
+        total = support.sum()
+        present = [label for label, seen in zip(self.classes, self.counts.sum(axis=0) + self.counts.sum(axis=1)) if seen]
+        if set(present) <= set(classes):
+            accuracy = self.accuracy()
+            rows['accuracy'] = [accuracy, accuracy, accuracy, accuracy]
+        else:
+            tp, predicted, _ = self._per_class(classes)
+            micro_p, micro_r = _divide(tp.sum(), predicted.sum()), _divide(tp.sum(), total)
+            rows['micro avg'] = [micro_p, micro_r, _divide(2 * micro_p * micro_r, micro_p + micro_r), total]
+        rows['macro avg'] = [precision.mean(), recall.mean(), f1.mean(), total] if classes else [0.0] * 3 + [total]
+        rows['weighted avg'] = [_divide(values @ support, total) for values in (precision, recall, f1)] + [total]
+        return pd.DataFrame.from_dict(rows, orient='index', columns=['precision', 'recall', 'f1-score', 'support'],
+                                      dtype=float)
+
+    def frame(self, classes=None):
+        # Counts with 'Actual:' rows and 'Predicted:' columns, in the order of `classes`.
+        classes = self.classes if classes is None else list(classes)
+        index = pd.Index(self.classes, dtype=object).get_indexer(classes)
+        padded = np.zeros((len(self.classes) + 1, len(self.classes) + 1), dtype=np.int64)
+        padded[:-1, :-1] = self.counts
+        return pd.DataFrame(padded[np.ix_(index, index)],
+                            columns=pd.MultiIndex.from_product([['Predicted:'], classes]),
+                            index=pd.MultiIndex.from_product([['Actual:'], classes]))
+
+
+def _divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 0.0)
+    return result if result.ndim else float(result)
+
+
+def confusion_matrix(true_labels, predicted_labels, classes=None, chunk_size=1_000_000):
+    # One ConfusionMatrix over two aligned label arrays, encoded chunk_size rows at a time.
+    matrix = ConfusionMatrix(classes)
+    true_labels = np.asarray(true_labels, dtype=object)
+    predicted_labels = np.asarray(predicted_labels, dtype=object)
+    if len(true_labels) != len(predicted_labels):
+        raise ValueError(f'{len(true_labels)} true labels but {len(predicted_labels)} predictions')
+    for start in range(0, len(true_labels), chunk_size):
+        matrix.update(true_labels[start:start + chunk_size], predicted_labels[start:start + chunk_size])
+    return matrix
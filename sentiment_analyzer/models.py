@@ -0,0 +1,59 @@
+import importlib
+
+
+######################### vectorizers and classifiers used by the supervised tasks
+
+# Estimators are referenced by import path so that listing the choices (CLI, UI) does
+# not pay for importing sklearn; the class (or factory) is only imported when a model is built.
+
+VECTORIZERS = {
+    'tfidf': ('sklearn.feature_extraction.text.TfidfVectorizer', dict(use_idf=True, min_df=0.0, max_df=1.0, ngram_range=(1, 2), sublinear_tf=True)),
+    'bow': ('sklearn.feature_extraction.text.CountVectorizer', dict(binary=False, min_df=0.0, max_df=1.0, ngram_range=(1, 2))),
+    # hashed float32 variants without a vocabulary, see features.py
+    'tfidf-compact': ('sentiment_analyzer.features.make_compact_tfidf', dict(n_features=2 ** 18, ngram_range=(1, 2), sublinear_tf=True)),
+    'bow-compact': ('sentiment_analyzer.features.make_compact_bow', dict(n_features=2 ** 18, ngram_range=(1, 2))),
+}
+
+CLASSIFIERS = {
+    'lr': ('sklearn.linear_model.LogisticRegression', dict(penalty='l2', max_iter=500, C=1)),
+    'svm': ('sklearn.linear_model.SGDClassifier', dict(loss='hinge', max_iter=100)),
+    'gbc': ('sklearn.ensemble.GradientBoostingClassifier', dict(n_estimators=10, random_state=42)),
+    'rfc': ('sklearn.ensemble.RandomForestClassifier', dict(n_estimators=10, random_state=42)),
+    # chi2-reduced, multi-core ensembles, see ensembles.py
+    'hgb': ('sentiment_analyzer.ensembles.make_fast_gbc', dict(reducer='chi2', k=300, max_iter=100)),
+    'rfc-fast': ('sentiment_analyzer.ensembles.make_fast_rfc', dict(reducer='chi2', k=20000, n_estimators=100, n_jobs=-1)),
+}
+
+VECTORIZER_TITLES = {'tfidf': 'TFIDF', 'bow': 'BOW', 'tfidf-compact': 'Compact TFIDF', 'bow-compact': 'Compact BOW'}
+CLASSIFIER_TITLES = {
+    'lr': 'Logistic Regression',
+    'svm': 'Support Vector Machine',
+    'gbc': 'Gradient Boosting Classifier',
+    'rfc': 'Random Forest Classifier',
+    'hgb': 'Histogram Gradient Boosting (chi2 features)',
+    'rfc-fast': 'Multi-core Random Forest (chi2 features)',
+}
+
+# current ensemble -> its fast counterpart, reported side by side in the app
+FAST_ENSEMBLES = {'gbc': 'hgb', 'rfc': 'rfc-fast'}
+
+
+def load_class(path):
+    module, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+def vectorizer_params(name, **overrides):
+    return {**VECTORIZERS[name][1], **overrides}
+
+
+def classifier_params(name, **overrides):
+    return {**CLASSIFIERS[name][1], **overrides}
+
+
+def make_vectorizer(name, **overrides):
+    return load_class(VECTORIZERS[name][0])(**vectorizer_params(name, **overrides))
+
+
+def make_classifier(name, **overrides):
+    return load_class(CLASSIFIERS[name][0])(**classifier_params(name, **overrides))
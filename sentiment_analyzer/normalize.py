@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+
+from sentiment_analyzer.parallel import map_chunks
+from sentiment_analyzer.resources import shared
+
+
+######################### text cleaning
+
+# app.py historically called re.sub(pattern, '', doc, re.I|re.A): the flags land in the
+# positional `count` argument, so at most 258 characters are removed per document.
+# We keep that so the batch engine returns exactly what normalize_document returns.
+_SUB_COUNT = re.I | re.A
+_NON_ALNUM = re.compile(r'[^a-zA-Z0-9\s]')
+
+# Once only [a-zA-Z0-9\s] is left, nltk.word_tokenize reduces to a whitespace split
+# plus the Treebank contraction rules below (matched on the lower-cased tokens).
+_CONTRACTIONS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+def _load_stop_words():
+    import nltk
+    return frozenset(nltk.corpus.stopwords.words('english'))
+
+
+def get_stop_words():
+    return shared('stop_words', _load_stop_words)
+
+
+def tokenize(doc):
+    tokens = doc.split()
+    if not _CONTRACTIONS.keys().isdisjoint(tokens):
+        split_tokens = []
+        for token in tokens:
+            split_tokens.extend(_CONTRACTIONS.get(token, (token,)))
+        tokens = split_tokens
+    return tokens
+
+
+def normalize_document(doc, stop_words=None):
+    if stop_words is None:
+        stop_words = get_stop_words()
+    doc, n_subs = _NON_ALNUM.subn('', doc, _SUB_COUNT)
+    doc = doc.lower()
+    doc = doc.strip()
+    if n_subs == _SUB_COUNT and _NON_ALNUM.search(doc):
+        # punctuation survived the capped substitution, let nltk handle it
+        import nltk
+        tokens = nltk.word_tokenize(doc)
+    else:
+        tokens = tokenize(doc)
+    return ' '.join([token for token in tokens if token not in stop_words])
+
+
+def _normalize_chunk(docs):
+    stop_words = get_stop_words()
+    return [normalize_document(doc, stop_words) for doc in docs]
+
+
+######################### corpus cleaning
+
+def normalize_corpus(docs, n_jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Drop-in replacement for np.vectorize(normalize_document): takes any sequence
+    # (list, ndarray, Series) and returns a numpy array of cleaned strings.
+    # n_jobs=None uses every core, n_jobs=1 stays in process. Corpora that fit in a
+    # single chunk are cleaned serially since shipping them to a worker would dominate.
+    docs = list(docs)
+    cleaned = []
+    for part in map_chunks(_normalize_chunk, docs, n_jobs=n_jobs, chunk_size=chunk_size):
+        cleaned.extend(part)
+
+    if not cleaned:
+        return np.array([], dtype=str)
+    return np.array(cleaned)
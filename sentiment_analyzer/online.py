@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+from sentiment_analyzer.cache import cached_normalize_corpus
+from sentiment_analyzer.ingest import DEFAULT_CHUNK_ROWS, iter_csv_chunks
+from sentiment_analyzer.pipeline import CLASSES, SUPERVISED_COLUMNS
+from sentiment_analyzer.registry import get_default_registry
+
+
+######################### incremental SVM (SGD hinge loss) on hashed features
+
+N_FEATURES = 2 ** 20
+
+
+def make_hashing_vectorizer(n_features=N_FEATURES):
+    # Stateless, so new data never needs a refit of the vocabulary: same unigram+bigram
+    # range as the TF-IDF/BOW models, non-negative counts, l2-normalized rows.
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=n_features, ngram_range=(1, 2),
+                             alternate_sign=False, norm='l2', dtype=np.float32)
+
+
+def checkpoint_key(name):
+    return f'online-{name}'
+
+
+class OnlineSVM:
+    # Checkpoints are ordinary model registry entries under 'online-<name>', so
+    # `predict --model online-<name>` and `serve` can use them like any trained model.
+
+    def __init__(self, name, classes=CLASSES, n_features=N_FEATURES, registry=None):
+        from sklearn.linear_model import SGDClassifier
+
+        self.name = name
+        self.registry = registry or get_default_registry()
+        entry = self.registry.load(checkpoint_key(name))
+        if entry is not None:
+            self.vectorizer = entry['vectorizer']
+            self.classifier = entry['classifier']
+            self.meta = entry['meta']
+        else:
+            self.vectorizer = make_hashing_vectorizer(n_features)
+            self.classifier = SGDClassifier(loss='hinge')
+            self.meta = {'vectorizer': 'hashing', 'classifier': 'svm', 'n_seen': 0, 'batches': 0}
+        self.classes = np.array(list(classes))
+
+    def partial_fit(self, reviews, labels):
+        features = self.vectorizer.transform(reviews)
+        labels = np.asarray(labels)
+        known = np.isin(labels, self.classes)
+        if not known.any():
+            # SGDClassifier.partial_fit raises on zero rows; nothing to learn from this chunk
+            return 0
+        # partial_fit needs every label in `classes`; rows with any other label are skipped
+        self.classifier.partial_fit(features[known], labels[known], classes=self.classes)
+        self.meta['n_seen'] += int(known.sum())
+        self.meta['batches'] += 1
+        return int(known.sum())
+
+    def save_checkpoint(self):
+        self.registry.save(checkpoint_key(self.name), self.vectorizer, self.classifier,
+                           meta=dict(self.meta, updated=time.time()))
+
+    def predict(self, reviews):
+        return self.classifier.predict(self.vectorizer.transform(reviews))
+
+    def train_stream(self, source, chunk_rows=DEFAULT_CHUNK_ROWS, n_jobs=None, progress=None):
+        # One partial_fit per chunk of labeled reviews, checkpointing after each, so a
+        # crash loses at most one chunk and the cost is proportional to the new data.
+        rows_done = 0
+        for chunk in iter_csv_chunks(source, usecols=SUPERVISED_COLUMNS, chunk_rows=chunk_rows):
+            chunk = chunk.fillna('')
+            reviews = cached_normalize_corpus(chunk['Clean Review'], n_jobs=n_jobs)
+            learned = self.partial_fit(reviews, chunk['sentiment'].to_numpy())
+            if learned:
+                rows_done += learned
+                self.save_checkpoint()
+            if progress is not None:
+                progress(rows_done, self.meta['n_seen'])
+        return rows_done
@@ -0,0 +1,61 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+######################### shared process pool
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def get_process_pool(max_workers=None):
+    # One pool per worker count for the whole process: workers (and whatever they load,
+    # e.g. the VADER lexicon, the stopword set or a model) survive between calls and
+    # Streamlit reruns, including for callers that ask for fewer workers than cores.
+    max_workers = max_workers or cpu_count()
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+        return pool
+
+
+def shutdown_process_pool(max_workers=None):
+    # the pool of max_workers workers, or every pool
+    with _pool_lock:
+        sizes = list(_pools) if max_workers is None else [max_workers]
+        for size in sizes:
+            pool = _pools.pop(size, None)
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+
+atexit.register(shutdown_process_pool)
+
+
+def iter_chunks(seq, chunk_size):
+    for start in range(0, len(seq), chunk_size):
+        yield seq[start:start + chunk_size]
+
+
+def map_chunks(func, items, n_jobs=None, chunk_size=2000):
+    # Applies func to consecutive slices of items and returns the per-slice results in
+    # order. Inputs that fit in one slice, or n_jobs=1, run in this process. Otherwise the
+    # slices go to the shared pool of n_jobs workers (default: one per core).
+    n_jobs = cpu_count() if n_jobs is None else min(n_jobs, cpu_count())
+    n_chunks = -(-len(items) // chunk_size)
+    if n_jobs <= 1 or n_chunks <= 1:
+        return [func(items)] if len(items) else []
+
+    try:
+        return list(get_process_pool(n_jobs).map(func, iter_chunks(items, chunk_size)))
+    except BrokenProcessPool:
+        shutdown_process_pool(n_jobs)
+        raise
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.cache import cached_normalize_corpus
+from sentiment_analyzer.evaluation import TRAIN_ROWS, make_splits
+from sentiment_analyzer.features import n_output_features
+from sentiment_analyzer.ingest import DEFAULT_CHUNK_ROWS, iter_csv_chunks
+from sentiment_analyzer.instrument import stage as timed
+from sentiment_analyzer.metrics import confusion_matrix
+from sentiment_analyzer.registry import get_default_registry
+
+
+######################### supervised pipeline without any UI
+
+SUPERVISED_COLUMNS = ['Clean Review', 'sentiment']
+CLASSES = ['positive', 'negative']
+
+
+def score_predictions(true_labels, predicted_labels):
+    # accuracy and weighted precision/recall/F1, all from one confusion matrix
+    return confusion_matrix(true_labels, predicted_labels).scores()
+
+
+def classification_report_frame(true_labels, predicted_labels, classes=CLASSES, matrix=None):
+    # sklearn's classification_report table; pass `matrix` (a ConfusionMatrix) when it
+    # has already been counted.
+    if matrix is None:
+        matrix = confusion_matrix(true_labels, predicted_labels, classes)
+    df_report = matrix.report(classes)
+    df_report.at['accuracy', 'precision'] = 0.0
+    df_report.at['accuracy', 'recall'] = 0.0
+    return df_report
+
+
+def read_labeled_reviews(source, chunk_rows=DEFAULT_CHUNK_ROWS):
+    chunks = [chunk.fillna('') for chunk in
+              iter_csv_chunks(source, usecols=SUPERVISED_COLUMNS, chunk_rows=chunk_rows)]
+    if not chunks:
+        return np.array([], dtype=object), np.array([], dtype=object)
+    df = pd.concat(chunks, ignore_index=True)
+    return np.array(df['Clean Review']), np.array(df['sentiment'])
+
+
+def load_supervised_data(source, train_rows=TRAIN_ROWS, n_jobs=None, strategy='head', test_size=0.3):
+    # Default is the split the app has always used: the first train_rows reviews train,
+    # the rest test. See evaluation.make_splits for the other strategies.
+    reviews, sentiments = read_labeled_reviews(source)
+    train_index, test_index = make_splits(sentiments, strategy=strategy, test_size=test_size,
+                                          train_rows=train_rows)[0]
+
+    train_reviews = reviews[train_index]
+    train_sentiments = sentiments[train_index]
+    test_reviews = reviews[test_index]
+    test_sentiments = sentiments[test_index]
+
+    norm_train_reviews = cached_normalize_corpus(train_reviews, n_jobs=n_jobs)
+    norm_test_reviews = cached_normalize_corpus(test_reviews, n_jobs=n_jobs)
+    return norm_train_reviews, train_sentiments, norm_test_reviews, test_sentiments
+
+
+def train_and_evaluate(vectorizer_name, classifier_name, train_reviews, train_labels,
+                       test_reviews, test_labels, registry=None,
+                       vectorizer_kwargs=None, classifier_kwargs=None):
+    registry = registry or get_default_registry()
+    vectorizer, classifier, from_cache = registry.get_or_train(
+        vectorizer_name, classifier_name, train_reviews, train_labels,
+        vectorizer_kwargs=vectorizer_kwargs, classifier_kwargs=classifier_kwargs)
+    with timed('transform', rows=len(test_reviews)):
+        test_features = vectorizer.transform(test_reviews)
+    with timed('predict', rows=len(test_reviews)):
+        predictions = classifier.predict(test_features)
+    with timed('metrics', rows=len(test_reviews)):
+        matrix = confusion_matrix(test_labels, predictions, CLASSES)
+    return {
+        'vectorizer': vectorizer,
+        'classifier': classifier,
+        'from_cache': from_cache,
+        'key': registry.key_for(vectorizer_name, classifier_name, train_reviews, train_labels,
+                                vectorizer_kwargs, classifier_kwargs),
+        'train_shape': (len(train_reviews), n_output_features(vectorizer)),
+        'test_shape': test_features.shape,
+        'predictions': predictions,
+        'confusion': matrix,
+        'metrics': matrix.scores(),
+    }
@@ -0,0 +1,214 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import joblib
+import sklearn
+
+from sentiment_analyzer.cache import get_cache_dir
+from sentiment_analyzer.instrument import stage as timed
+from sentiment_analyzer.models import classifier_params, make_classifier, make_vectorizer, vectorizer_params
+from sentiment_analyzer.resources import ResourceManager, get_resource_manager
+
+
+######################### fingerprints
+
+def fingerprint_data(reviews, labels):
+    h = hashlib.blake2b(digest_size=20)
+    for review, label in zip(reviews, labels):
+        h.update(str(review).encode('utf-8', 'surrogatepass'))
+        h.update(b'\0')
+        h.update(str(label).encode('utf-8', 'surrogatepass'))
+        h.update(b'\1')
+    h.update(str(len(reviews)).encode())
+    return h.hexdigest()
+
+
+def fingerprint_model(data_fingerprint, vectorizer_name, classifier_name,
+                      vectorizer_kwargs, classifier_kwargs):
+    spec = {
+        'data': data_fingerprint,
+        'vectorizer': [vectorizer_name, vectorizer_kwargs],
+        'classifier': [classifier_name, classifier_kwargs],
+        'sklearn': sklearn.__version__,
+    }
+    blob = json.dumps(spec, sort_keys=True, default=repr).encode()
+    return hashlib.blake2b(blob, digest_size=20).hexdigest()
+
+
+######################### model registry
+
+class ModelRegistry:
+    # Fitted (vectorizer, classifier) pairs on local disk, one joblib file per
+    # fingerprint of training data + hyperparameters + sklearn version. Loaded entries
+    # live in a ResourceManager (the process-wide one for the default cache directory),
+    # so every session shares one copy of each model. Entries rewritten under the same
+    # key (online checkpoints, possibly by another process) are noticed by their file
+    # mtime and reloaded on the next load/use/hold, unless someone still holds the old one.
+
+    def __init__(self, root=None, resources=None):
+        if resources is None:
+            resources = get_resource_manager() if root is None else ResourceManager()
+        self.root = root or get_cache_dir('models')
+        self.resources = resources
+        self._mtimes = {}
+
+    def path_for(self, key):
+        return os.path.join(self.root, f'{key}.joblib')
+
+    def meta(self, key):
+        # The entry's meta from its JSON sidecar, without unpickling the model
+        # ({} for entries saved before sidecars existed).
+        try:
+            with open(os.path.join(self.root, f'{key}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def vectorizer_path(self, vectorizer_key):
+        return os.path.join(self.root, 'vectorizers', f'{vectorizer_key}.joblib')
+
+    def vectorizer_key_for(self, vectorizer_name, data_fingerprint, vectorizer_kwargs=None):
+        # the vectorizer half of key_for: same data and vectorizer config, any classifier
+        return fingerprint_model(data_fingerprint, vectorizer_name, None,
+                                 vectorizer_params(vectorizer_name, **(vectorizer_kwargs or {})), None)
+
+    def _mtime(self, key):
+        try:
+            return os.stat(self.path_for(key)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self, key):
+        path = self.path_for(key)
+        mtime = self._mtime(key)
+        if mtime is None:
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception:
+            # truncated or written by an incompatible version: retrain over it
+            return None
+        if 'vectorizer_key' in entry:
+            # saved with a vectorizer shared by several classifiers, loaded once for all
+            vectorizer = self._load_vectorizer(entry['vectorizer_key'])
+            if vectorizer is None:
+                return None
+            entry = {**entry, 'vectorizer': vectorizer}
+        self._mtimes[key] = mtime
+        return entry
+
+    def _read_vectorizer(self, vectorizer_key):
+        try:
+            return joblib.load(self.vectorizer_path(vectorizer_key))
+        except Exception:
+            return None
+
+    def _load_vectorizer(self, vectorizer_key):
+        return self.resources.get(f'vectorizer:{vectorizer_key}',
+                                  functools.partial(self._read_vectorizer, vectorizer_key))
+
+    @staticmethod
+    def resource_name(key):
+        return f'model:{key}'
+
+    def _refresh(self, key):
+        # drop the loaded copy if the file changed since it was read or saved
+        loaded = self._mtimes.get(key)
+        if loaded is not None and self._mtime(key) != loaded:
+            self.resources.evict(self.resource_name(key))
+
+    def load(self, key):
+        self._refresh(key)
+        return self.resources.get(self.resource_name(key), functools.partial(self._read, key))
+
+    def use(self, key):
+        # Context manager holding the entry (None if missing) so it is not evicted
+        # under SENTIMENT_RESOURCE_MAX_MB while in use.
+        self._refresh(key)
+        return self.resources.acquire(self.resource_name(key), functools.partial(self._read, key))
+
+    def hold(self, key):
+        # load() for long-lived users (the HTTP server); pair with release(key).
+        self._refresh(key)
+        return self.resources.hold(self.resource_name(key), functools.partial(self._read, key))
+
+    def release(self, key):
+        self.resources.release(self.resource_name(key))
+
+    @staticmethod
+    def _dump(value, path):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+    def save(self, key, vectorizer, classifier, meta=None, vectorizer_key=None):
+        # With vectorizer_key (see vectorizer_key_for) the vectorizer is written once under
+        # vectorizers/ and every classifier trained on it refers to that file.
+        entry = {'vectorizer': vectorizer, 'classifier': classifier, 'meta': meta or {}}
+        path = self.path_for(key)
+        stored = entry
+        if vectorizer_key is not None:
+            vectorizer_path = self.vectorizer_path(vectorizer_key)
+            if not os.path.exists(vectorizer_path):
+                os.makedirs(os.path.dirname(vectorizer_path), exist_ok=True)
+                self._dump(vectorizer, vectorizer_path)
+            if self.resources.peek(f'vectorizer:{vectorizer_key}') is None:
+                self.resources.put(f'vectorizer:{vectorizer_key}', vectorizer)
+            stored = {'vectorizer_key': vectorizer_key, 'classifier': classifier, 'meta': entry['meta']}
+        self._dump(stored, path)
+        self._mtimes[key] = self._mtime(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry['meta'], f, default=repr)
+        os.replace(tmp_path, os.path.join(self.root, f'{key}.json'))
+        return self.resources.put(self.resource_name(key), entry)
+
+    def entries(self):
+        for name in sorted(os.listdir(self.root)):
+            if name.endswith('.joblib'):
+                yield name[:-len('.joblib')]
+
+    def key_for(self, vectorizer_name, classifier_name, train_reviews, train_labels,
+                vectorizer_kwargs=None, classifier_kwargs=None, data_fingerprint=None):
+        if data_fingerprint is None:
+            data_fingerprint = fingerprint_data(train_reviews, train_labels)
+        return fingerprint_model(data_fingerprint, vectorizer_name, classifier_name,
+                                 vectorizer_params(vectorizer_name, **(vectorizer_kwargs or {})),
+                                 classifier_params(classifier_name, **(classifier_kwargs or {})))
+
+    def get_or_train(self, vectorizer_name, classifier_name, train_reviews, train_labels,
+                     vectorizer_kwargs=None, classifier_kwargs=None, data_fingerprint=None):
+        # Returns (vectorizer, classifier, from_cache).
+        key = self.key_for(vectorizer_name, classifier_name, train_reviews, train_labels,
+                           vectorizer_kwargs, classifier_kwargs, data_fingerprint)
+        with timed('load_model'):
+            entry = self.load(key)
+        if entry is not None:
+            return entry['vectorizer'], entry['classifier'], True
+
+        vectorizer = make_vectorizer(vectorizer_name, **(vectorizer_kwargs or {}))
+        classifier = make_classifier(classifier_name, **(classifier_kwargs or {}))
+        with timed('vectorize', rows=len(train_reviews)):
+            train_features = vectorizer.fit_transform(train_reviews)
+        with timed('fit', rows=len(train_reviews)):
+            classifier.fit(train_features, train_labels)
+        with timed('save_model'):
+            self.save(key, vectorizer, classifier,
+                      meta={'vectorizer': vectorizer_name, 'classifier': classifier_name,
+                            'n_train': len(train_reviews), 'n_features': train_features.shape[1]})
+        return vectorizer, classifier, False
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry():
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
@@ -0,0 +1,272 @@
+import contextlib
+import itertools
+import os
+import sys
+import threading
+import time
+
+from sentiment_analyzer.instrument import current_rss
+
+
+######################### process-wide shared resources
+
+# Every Streamlit session is a thread of the same process, so one copy of the VADER
+# lexicon, the stopword set, the TextBlob analyzer and each loaded model serves all of
+# them. Pool workers are separate processes and hold their own copy.
+
+
+SAMPLE_ITEMS = 256
+
+
+def _sampled_size(items, n):
+    # size of n items extrapolated from the first SAMPLE_ITEMS of them
+    sample = list(itertools.islice(items, SAMPLE_ITEMS))
+    return int(sum(estimate_size(item) for item in sample) * n / len(sample)) if sample else 0
+
+
+def estimate_size(obj, _seen=None):
+    # Rough deep size in bytes: numpy buffers, scipy sparse parts, containers and
+    # instance attributes (a fitted vectorizer or classifier is mostly those).
+    # Containers of more than SAMPLE_ITEMS items (a bigram vocabulary_ has millions) are
+    # extrapolated from a sample, so sizing a loaded model stays in the milliseconds.
+    seen = set() if _seen is None else _seen
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        if isinstance(getattr(obj, 'nbytes', None), int) and not hasattr(obj, '__dict__'):  # numpy array
+            # a view is charged for the array that owns its buffer, once
+            owner = obj
+            while type(getattr(owner, 'base', None)) is type(obj):
+                owner = owner.base
+            if owner is obj or id(owner) not in seen:
+                seen.add(id(owner))
+                total += owner.nbytes
+            if getattr(obj, 'dtype', None) == object:
+                if obj.size > SAMPLE_ITEMS:
+                    total += _sampled_size(obj.flat, obj.size)
+                else:
+                    stack.extend(obj.ravel().tolist())
+            continue
+        try:
+            total += sys.getsizeof(obj)
+        except TypeError:
+            pass
+        if isinstance(obj, dict):
+            if len(obj) > SAMPLE_ITEMS:
+                total += _sampled_size(itertools.chain.from_iterable(obj.items()), 2 * len(obj))
+            else:
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            if len(obj) > SAMPLE_ITEMS:
+                total += _sampled_size(obj, len(obj))
+            else:
+                stack.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            stack.append(vars(obj))
+        elif hasattr(obj, '__slots__'):
+            stack.extend(getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot))
+    return total
+
+
+class Resource:
+    # One lazily loaded value plus its bookkeeping. `refs` counts the users currently
+    # holding it (see ResourceManager.acquire); only unreferenced, unpinned resources
+    # are evicted.
+
+    __slots__ = ('name', 'loader', 'pinned', 'value', 'refs', 'size', 'rss_delta', 'load_seconds',
+                 'loads', 'hits', 'last_used', 'lock')
+
+    def __init__(self, name, loader=None, pinned=False):
+        self.name = name
+        self.loader = loader
+        self.pinned = pinned
+        self.value = None
+        self.refs = 0
+        self.size = 0
+        self.rss_delta = 0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.last_used = None
+        self.lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.value is not None
+
+    def as_dict(self):
+        return {'resource': self.name, 'loaded': self.loaded, 'pinned': self.pinned, 'refs': self.refs,
+                'size_bytes': self.size, 'rss_delta_bytes': self.rss_delta, 'load_seconds': self.load_seconds,
+                'loads': self.loads, 'hits': self.hits, 'last_used': self.last_used}
+
+
+class ResourceManager:
+    # Named, lazily initialized singletons shared by every thread of the process.
+    # Loading takes a per-resource lock, so concurrent first requests build the value
+    # once and the others wait for it, while unrelated resources load in parallel.
+    # A loader returning None (e.g. a model file that does not exist) caches nothing.
+    #
+    # With max_bytes set, loading past the budget evicts the least recently used
+    # resources that are neither pinned nor held by anyone; a resource still in use is
+    # evicted once its last holder releases it.
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, pinned=False):
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is None:
+                resource = self._resources[name] = Resource(name, loader, pinned)
+            elif resource.loader is None:
+                resource.loader, resource.pinned = loader, pinned
+            return resource
+
+    def _resource(self, name, loader=None, pinned=False):
+        resource = self._resources.get(name)  # lock-free fast path: get() sits on hot loops
+        if resource is None or resource.loader is None and loader is not None:
+            resource = self.register(name, loader, pinned)
+        return resource
+
+    def get(self, name, loader=None, pinned=False):
+        # The value of `name`, loading it with its registered loader (or `loader`) first.
+        resource = self._resource(name, loader, pinned)
+        value = self._load(resource)
+        resource.last_used = time.time()
+        return value
+
+    def _load(self, resource):
+        value = resource.value
+        if value is not None:
+            resource.hits += 1
+            return value
+        with resource.lock:
+            if resource.value is not None:
+                resource.hits += 1
+                return resource.value
+            if resource.loader is None:
+                raise KeyError(f'no loader registered for resource {resource.name!r}')
+            rss_before = current_rss()
+            start = time.perf_counter()
+            value = resource.loader()
+            if value is None:
+                return None
+            self._set(resource, value, time.perf_counter() - start, rss_before)
+        self._enforce_budget(keep=resource.name)
+        return value
+
+    def _set(self, resource, value, seconds=0.0, rss_before=None):
+        rss_after = current_rss()
+        resource.value = value
+        resource.size = estimate_size(value)
+        resource.rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        resource.load_seconds = seconds
+        resource.loads += 1
+
+    def put(self, name, value, pinned=False):
+        # Stores an already built value (a model that was just trained).
+        resource = self._resource(name, pinned=pinned)
+        with resource.lock:
+            self._set(resource, value)
+        resource.last_used = time.time()
+        self._enforce_budget(keep=name)
+        return value
+
+    def peek(self, name):
+        # The value if it is loaded, without loading it.
+        with self._lock:
+            resource = self._resources.get(name)
+        return None if resource is None else resource.value
+
+    @contextlib.contextmanager
+    def acquire(self, name, loader=None, pinned=False):
+        # Holds `name` for the duration of the block: it will not be evicted meanwhile.
+        #     with manager.acquire('model:<key>') as entry:
+        #         ...
+        resource = self._resource(name, loader, pinned)
+        with self._lock:
+            resource.refs += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                resource.refs -= 1
+            self._enforce_budget()
+
+    def hold(self, name, loader=None, pinned=False):
+        # acquire() for long-lived holders (a server keeping its models); pair with release().
+        resource = self._resource(name, loader, pinned)
+        with self._lock:
+            resource.refs += 1
+        try:
+            return self.get(name)
+        except BaseException:
+            self.release(name)
+            raise
+
+    def release(self, name):
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is not None and resource.refs > 0:
+                resource.refs -= 1
+        self._enforce_budget()
+
+    def evict(self, name):
+        # Drops the value of an unreferenced resource; True if it was dropped.
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is None or resource.refs > 0 or resource.value is None:
+                return False
+            resource.value, resource.size, resource.rss_delta = None, 0, 0
+            self.evictions += 1
+            return True
+
+    def _enforce_budget(self, keep=None):
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            candidates = sorted((r for r in self._resources.values()
+                                 if r.value is not None and not r.pinned and r.refs == 0 and r.name != keep),
+                                key=lambda r: r.last_used or 0)
+            total = sum(r.size for r in self._resources.values() if r.value is not None)
+        for resource in candidates:
+            if total <= self.max_bytes:
+                break
+            size = resource.size
+            if self.evict(resource.name):
+                total -= size
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(r.size for r in self._resources.values() if r.value is not None)
+
+    def stats(self):
+        with self._lock:
+            return [resource.as_dict() for resource in self._resources.values()]
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_resource_manager():
+    # SENTIMENT_RESOURCE_MAX_MB caps what unpinned resources (loaded models) may hold.
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            max_mb = os.environ.get('SENTIMENT_RESOURCE_MAX_MB')
+            _default_manager = ResourceManager(max_bytes=int(float(max_mb) * 2 ** 20) if max_mb else None)
+        return _default_manager
+
+
+def shared(name, loader, pinned=True):
+    # The process-wide value of `name`; loaders of the built-in resources are pinned.
+    return get_resource_manager().get(name, loader, pinned=pinned)
@@ -0,0 +1,94 @@
+from sentiment_analyzer.blob import score_textblob, textblob_labels
+from sentiment_analyzer.dedup import dedup_normalize, dedup_score
+from sentiment_analyzer.vader import get_vader_analyzer, score_vader, vader_labels
+
+
+######################### custom functions TextBlob
+
+def polarity(txt):
+    from textblob import TextBlob
+    try:
+        return TextBlob(txt).sentiment.polarity
+    except:
+        return None
+
+def subjectivity(txt):
+    from textblob import TextBlob
+    try:
+        return TextBlob(txt).sentiment.subjectivity
+    except:
+        return None
+
+def analyze(x):
+    if x < 0:
+        return 'negative'
+    elif x == 0:
+        return 'neutral'
+    else:
+        return 'positive'
+
+
+######################### functions for sentiment VADER analysis
+
+def vader_sentiment(txt):
+    analyzer = get_vader_analyzer()  # a missing lexicon raises instead of scoring None
+    try:
+        return analyzer.polarity_scores(txt)['compound']
+    except:
+        return None
+
+
+def vader_analysis(sentiment, neg_threshold=-0.05, pos_threshold=0.05):
+    if sentiment < neg_threshold:
+        label = 'negative'
+    elif sentiment > pos_threshold:
+        label = 'positive'
+    else:
+        label = 'neutral'
+    return label
+
+
+######################### per-chunk stages (one DataFrame chunk in, one out)
+
+CLEAN_COLUMNS = ['Review']
+CLEAN_SENTIMENT_COLUMNS = ['Review', 'sentiment']
+TEXTBLOB_COLUMNS = ['Clean Review']
+VADER_COLUMNS = ['Review']
+SENTIMENT_COLUMNS = ['Review']
+
+
+def clean_chunk(df, n_jobs=None):
+    df = df.copy()
+    df['Clean Review'] = dedup_normalize(df['Review'], n_jobs=n_jobs)
+    return df[['Review', 'Clean Review']]
+
+
+def clean_sentiment_chunk(df, n_jobs=None):
+    df = df.copy()
+    df['Clean Review'] = dedup_normalize(df['Review'], n_jobs=n_jobs)
+    return df[['Clean Review', 'sentiment']]
+
+
+def textblob_chunk(df, n_jobs=None):
+    df = df.copy()
+    scores = score_textblob(df['Clean Review'], n_jobs=n_jobs)
+    df['polarity'] = scores['polarity']
+    df['subjectivity'] = scores['subjectivity']
+    df['sentiment'] = textblob_labels(df['polarity'])
+    return df[['Clean Review', 'polarity', 'subjectivity', 'sentiment']]
+
+
+def vader_chunk(df, n_jobs=None):
+    df = df.copy()
+    df['compound'] = score_vader(df['Review'], n_jobs=n_jobs)['compound']
+    df['sentiment'] = vader_labels(df['compound'])
+    return df[['Review', 'compound', 'sentiment']]
+
+
+def sentiment_chunk(df, n_jobs=None, stats=None):
+    # Cleaner, TextBlob and VADER in one pass, each over the distinct reviews only.
+    # stats: an optional dedup.DedupStats collecting the dedup ratio across chunks.
+    df = dedup_score(df['Review'], n_jobs=n_jobs, stats=stats)
+    df.insert(4, 'textblob_sentiment', textblob_labels(df['polarity']))
+    df['vader_sentiment'] = vader_labels(df['compound'])
+    return df
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+######################### latency tracking
+
+class LatencyRecorder:
+    # Keeps the most recent `window` request latencies (seconds) for percentiles.
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'count': self.count, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(np.fromiter(self.samples, dtype=float), [50, 99]) * 1000
+        return {'count': self.count, 'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3)}
+
+
+######################### request coalescing
+
+class MicroBatcher:
+    # Concurrent submit() calls are queued and flushed together as one call to
+    # batch_fn(texts) -> list of results, either when max_batch texts are waiting or
+    # max_wait seconds after the first one arrived. batch_fn runs in a worker thread so
+    # the event loop keeps accepting requests meanwhile.
+
+    def __init__(self, batch_fn, max_batch=512, max_wait=0.002):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def submit(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                results = await loop.run_in_executor(None, self.batch_fn, texts)
+            except Exception as exc:
+                if len(pending) == 1:
+                    if not pending[0][1].done():
+                        pending[0][1].set_exception(exc)
+                    continue
+                # one bad request must not fail the others coalesced with it: rescore
+                # each on its own so only the culprit gets the error
+                for item_texts, future in pending:
+                    try:
+                        result = await loop.run_in_executor(None, self.batch_fn, item_texts)
+                    except Exception as item_exc:
+                        if not future.done():
+                            future.set_exception(item_exc)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+            self.batches += 1
+            start = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(results[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+######################### scorers
+
+def make_model_scorer(vectorizer, classifier):
+    from sentiment_analyzer.normalize import normalize_corpus
+
+    def score(texts):
+        # one sparse transform + predict for the whole coalesced batch
+        features = vectorizer.transform(normalize_corpus(texts, n_jobs=1))
+        return [{'label': label} for label in classifier.predict(features).tolist()]
+    return score
+
+
+def vader_scorer(texts):
+    from sentiment_analyzer.vader import score_vader, vader_labels
+    scores = score_vader(texts, n_jobs=1)
+    scores['sentiment'] = vader_labels(scores['compound'])
+    return scores.to_dict('records')
+
+
+def textblob_scorer(texts):
+    from sentiment_analyzer.blob import score_textblob, textblob_labels
+    scores = score_textblob(texts, n_jobs=1)
+    scores['sentiment'] = textblob_labels(scores['polarity'])
+    return scores.to_dict('records')
+
+
+######################### HTTP server
+
+class PredictionServer:
+    # POST /predict/<model key>, /vader and /textblob take {"text": "..."} or
+    # {"texts": [...]}; GET /stats reports latency percentiles per endpoint.
+
+    def __init__(self, models=None, max_batch=512, max_wait=0.002):
+        self.scorers = {'vader': vader_scorer, 'textblob': textblob_scorer}
+        for key, (vectorizer, classifier) in (models or {}).items():
+            self.scorers[f'predict/{key}'] = make_model_scorer(vectorizer, classifier)
+        if models:
+            # bare /predict goes to the first model given
+            self.scorers['predict'] = self.scorers[f'predict/{next(iter(models))}']
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batchers = {}
+        self.latency = {name: LatencyRecorder() for name in self.scorers}
+
+    async def start(self, host='127.0.0.1', port=8000):
+        for name, scorer in self.scorers.items():
+            self.batchers[name] = MicroBatcher(scorer, self.max_batch, self.max_wait)
+            self.batchers[name].start()
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self._dispatch(method, path.strip('/'), body)
+                except Exception as exc:
+                    status, payload = '500 Internal Server Error', {'error': f'{type(exc).__name__}: {exc}'}
+                data = json.dumps(payload).encode()
+                writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+                             f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, route, body):
+        if method == 'GET' and route == 'health':
+            return '200 OK', {'status': 'ok'}
+        if method == 'GET' and route == 'stats':
+            return '200 OK', {name: {**recorder.summary(), 'batches': self.batchers[name].batches}
+                              for name, recorder in self.latency.items()}
+        if method != 'POST' or route not in self.scorers:
+            return '404 Not Found', {'error': f'unknown endpoint {method} /{route}'}
+
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            request = None
+        single = isinstance(request, dict) and 'text' in request
+        texts = [request['text']] if single else request.get('texts') if isinstance(request, dict) else None
+        if not isinstance(texts, list):
+            # a bare string would otherwise be scored one character at a time
+            return '400 Bad Request', {'error': 'expected {"text": "..."} or {"texts": ["...", ...]}'}
+        if not all(isinstance(text, str) for text in texts):
+            return '400 Bad Request', {'error': 'every text must be a string'}
+        if not texts:
+            return '200 OK', {'results': []}
+
+        start = time.perf_counter()
+        results = await self.batchers[route].submit(texts)
+        self.latency[route].record(time.perf_counter() - start)
+        return '200 OK', results[0] if single else {'results': results}
+
+
+def serve(model_keys=(), host='127.0.0.1', port=8000, max_batch=512, max_wait=0.002, registry=None):
+    from sentiment_analyzer.registry import get_default_registry
+
+    registry = registry or get_default_registry()
+    models = {}
+    for key in model_keys:
+        if registry.load(key) is None:
+            raise KeyError(f'no model {key!r} in the registry')
+        entry = registry.hold(key)  # never evicted while the server runs
+        models[key] = (entry['vectorizer'], entry['classifier'])
+
+    async def main():
+        server = PredictionServer(models, max_batch=max_batch, max_wait=max_wait)
+        listener = await server.start(host, port)
+        async with listener:
+            await listener.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+import threading
+import time
+
+
+######################### NLTK data: check locally, download only what is missing
+
+NLTK_RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+    'punkt': 'tokenizers/punkt',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+CLEAN_RESOURCES = ['stopwords', 'punkt']
+VADER_RESOURCES = ['vader_lexicon']
+
+_found = set()
+_download_tried = set()
+_lock = threading.Lock()
+
+
+def ensure_nltk_resources(names=None):
+    # Returns {name: available}. A missing resource is looked up locally again on every
+    # call (cheap, and data installed by hand is picked up without a restart) but
+    # downloaded at most once per process, even when the download fails offline, so
+    # Streamlit reruns never hit the network twice.
+    import nltk
+
+    names = list(NLTK_RESOURCES) if names is None else names
+    status = {}
+    with _lock:
+        for name in names:
+            if name not in _found:
+                try:
+                    nltk.data.find(NLTK_RESOURCES[name])
+                    _found.add(name)
+                except LookupError:
+                    if name not in _download_tried:
+                        _download_tried.add(name)
+                        if nltk.download(name, quiet=True):
+                            _found.add(name)
+            status[name] = name in _found
+    return status
+
+
+######################### import-time budget
+
+# what app.py needs before the Home page can render
+HOME_IMPORTS = ['streamlit', 'pandas', 'numpy', 'sentiment_analyzer.ingest', 'sentiment_analyzer.scoring']
+DEFAULT_IMPORT_BUDGET = 1.0
+
+
+def measure_import_time(modules=HOME_IMPORTS, python=sys.executable):
+    # Imports `modules` in a fresh interpreter, which is what a cold Streamlit start pays.
+    code = 'import time; t = time.perf_counter(); ' + '; '.join(f'import {m}' for m in modules) \
+        + '; print(time.perf_counter() - t)'
+    start = time.perf_counter()
+    try:
+        output = subprocess.run([python, '-c', code], check=True, capture_output=True, text=True).stdout
+    except subprocess.CalledProcessError as exc:
+        # e.g. streamlit not installed in this environment: the last line names the error
+        lines = exc.stderr.strip().splitlines()
+        raise ImportError(lines[-1] if lines else f'{python} exited with status {exc.returncode}') from None
+    return {'imports': float(output.strip().splitlines()[-1]),
+            'interpreter': time.perf_counter() - start}
+
+
+def check_import_budget(budget=DEFAULT_IMPORT_BUDGET, modules=HOME_IMPORTS):
+    timings = measure_import_time(modules)
+    return timings['imports'] <= budget, timings
@@ -0,0 +1,232 @@
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from sentiment_analyzer.cache import get_cache_dir
+
+
+######################### search space
+
+VECTORIZER_GRID = {
+    'tfidf': dict(ngram_range=[(1, 1), (1, 2)], min_df=[1, 2, 5], sublinear_tf=[True, False]),
+    'bow': dict(ngram_range=[(1, 1), (1, 2)], min_df=[1, 2, 5]),
+}
+
+CLASSIFIER_GRID = {
+    'lr': dict(C=[0.1, 1, 10], max_iter=[500]),
+    'svm': dict(alpha=[1e-5, 1e-4, 1e-3], max_iter=[100, 1000]),
+    'gbc': dict(n_estimators=[10, 50, 100], learning_rate=[0.1, 0.3]),
+    'rfc': dict(n_estimators=[10, 50, 100], n_jobs=[1]),
+    'hgb': dict(k=[300, 1000], learning_rate=[0.1, 0.3]),
+    'rfc-fast': dict(k=[5000, 20000], n_estimators=[50, 100], n_jobs=[1]),
+}
+
+
+def expand_grid(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def make_candidates(vectorizer_names=None, classifier_names=None):
+    candidates = []
+    for vectorizer_name in vectorizer_names or VECTORIZER_GRID:
+        for vectorizer_kwargs in expand_grid(VECTORIZER_GRID[vectorizer_name]):
+            for classifier_name in classifier_names or CLASSIFIER_GRID:
+                for classifier_kwargs in expand_grid(CLASSIFIER_GRID[classifier_name]):
+                    candidates.append({'vectorizer': vectorizer_name, 'vectorizer_kwargs': vectorizer_kwargs,
+                                       'classifier': classifier_name, 'classifier_kwargs': classifier_kwargs})
+    return candidates
+
+
+def _config_key(name, kwargs):
+    return name, json.dumps(kwargs, sort_keys=True)
+
+
+def _candidate_key(candidate):
+    return json.dumps(candidate, sort_keys=True)
+
+
+def _classifier_key(candidate):
+    return _config_key(candidate['classifier'], candidate['classifier_kwargs'])
+
+
+def _estimate(timings, keys, n_rows):
+    # seconds for n_rows from the first of `keys` timed so far, assuming linear growth
+    for key in keys:
+        if key in timings:
+            seconds, rows = timings[key]
+            return seconds * n_rows / rows
+    return 0.0
+
+
+######################### successive halving
+
+def _fit_and_score(candidate, train_features, train_labels, test_features, test_labels):
+    from sentiment_analyzer.metrics import confusion_matrix
+    from sentiment_analyzer.models import make_classifier
+
+    start = time.perf_counter()
+    classifier = make_classifier(candidate['classifier'], **candidate['classifier_kwargs'])
+    classifier.fit(train_features, train_labels)
+    scores = confusion_matrix(test_labels, classifier.predict(test_features)).scores()
+    return {'f1': scores['f1'],
+            'accuracy': scores['accuracy'],
+            'fit_seconds': time.perf_counter() - start}
+
+
+def _rung_cost(candidates, n_rows, timings, n_workers):
+    # estimated seconds to vectorize and fit `candidates` on n_rows
+    fits = [_estimate(timings, [_candidate_key(c), _classifier_key(c)], n_rows) for c in candidates]
+    configs = {_config_key(c['vectorizer'], c['vectorizer_kwargs']): c['vectorizer'] for c in candidates}
+    vectorize = sum(_estimate(timings, [key, name], n_rows) for key, name in configs.items())
+    return vectorize + max(max(fits, default=0.0), sum(fits) / n_workers)
+
+
+def _schedule(ranked, n_rows, n_total, eta, left, timings, n_workers):
+    # (survivors, rows) for the next rung: the usual top 1/eta on n_rows * eta, cut down
+    # until carrying them through every remaining rung up to all n_total rows fits in
+    # `left` seconds. A lone survivor that still does not fit skips straight to all the
+    # rows, on the time successive_halving held back for it.
+    def path_cost(survivors, rows):
+        cost = 0.0
+        while True:
+            cost += _rung_cost(survivors, rows, timings, n_workers)
+            if rows >= n_total:
+                return cost
+            survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+            rows = min(rows * eta, n_total)
+
+    rows = min(n_rows * eta, n_total)
+    keep = max(1, math.ceil(len(ranked) / eta))
+    while keep > 1 and path_cost(ranked[:keep], rows) > left:
+        keep -= 1
+    if path_cost(ranked[:keep], rows) <= left:
+        return ranked[:keep], rows
+    return ranked[:1], n_total
+
+
+def successive_halving(reviews, labels, candidates=None, budget=600, eta=3, min_rows=2000,
+                       test_size=0.2, n_jobs=None, random_state=42):
+    # Rung r trains every surviving candidate on min_rows * eta**r rows (up to all of
+    # them) and keeps the best 1/eta by weighted F1 on a fixed stratified holdout.
+    # Features are cached per (vectorizer config, rung), so candidates that differ only in
+    # the classifier share one tokenization; classifiers for a feature set fit in parallel.
+    #
+    # Budget: timings of earlier fits (the same candidate, else the same classifier or
+    # vectorizer config), scaled linearly to the rows of a rung, estimate what is left
+    # to do. Within a rung, a feature set is only started, and a candidate only fit,
+    # when it is expected to finish and still leave enough time to train the eta best
+    # candidates so far on all the rows. Between rungs, fewer survivors are kept (or the
+    # intermediate rungs are skipped) so that the winner is trained on all the rows
+    # before the deadline. Work already running is not interrupted and estimates are
+    # rough, so the search can overrun `budget` by however much the last feature set
+    # takes beyond its estimate; the very first one has no estimate at all.
+    from joblib import Parallel, delayed
+    from sentiment_analyzer.evaluation import make_splits
+    from sentiment_analyzer.models import make_vectorizer
+    from sentiment_analyzer.parallel import cpu_count
+
+    deadline = time.monotonic() + budget
+    reviews = np.asarray(reviews, dtype=object)
+    labels = np.asarray(labels)
+    candidates = candidates or make_candidates()
+    train_index, test_index = make_splits(labels, strategy='stratified', test_size=test_size,
+                                          random_state=random_state)[0]
+    order = np.random.RandomState(random_state).permutation(train_index)
+    n_total = len(order)
+    n_workers = cpu_count() if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+
+    history = []
+    survivors = list(candidates)
+    timings = {}  # candidate / classifier / vectorizer config -> (seconds, rows) of its latest run
+    n_rows = min(min_rows, n_total)
+    rung = 0
+    with Parallel(n_jobs=n_jobs or -1) as parallel:
+        while survivors:
+            rung_index = order[:n_rows]
+            scored = []
+            groups = {}
+            for candidate in survivors:
+                key = _config_key(candidate['vectorizer'], candidate['vectorizer_kwargs'])
+                groups.setdefault(key, []).append(candidate)
+
+            for key, group in groups.items():
+                left = deadline - time.monotonic()
+                if scored and n_rows < n_total:
+                    # keep enough time to train the eta best candidates so far on all the rows
+                    leaders = sorted(scored, key=lambda entry: entry['f1'], reverse=True)[:eta]
+                    left -= _rung_cost(leaders, n_total, timings, n_workers)
+                vectorize_estimate = _estimate(timings, [key, group[0]['vectorizer']], n_rows)
+                estimates = [_estimate(timings, [_candidate_key(c), _classifier_key(c)], n_rows) for c in group]
+                order_by_cost = np.argsort(estimates, kind='stable')
+                group = [group[i] for i in order_by_cost]
+                estimates = [estimates[i] for i in order_by_cost]
+                # classifiers fit n_workers at a time, each must end before the deadline;
+                # the first feature set on all the rows was budgeted when the rung was
+                # scheduled and always runs, so there is a full-data winner
+                scheduled = rung > 0 and n_rows >= n_total and not scored
+                while (group and not scheduled
+                       and vectorize_estimate + max(estimates[-1], sum(estimates) / n_workers) >= left):
+                    group.pop()
+                    estimates.pop()
+                if not group:
+                    continue
+                start = time.monotonic()
+                vectorizer = make_vectorizer(group[0]['vectorizer'], **group[0]['vectorizer_kwargs'])
+                train_features = vectorizer.fit_transform(reviews[rung_index])
+                test_features = vectorizer.transform(reviews[test_index])
+                timings[key] = timings[group[0]['vectorizer']] = (time.monotonic() - start, n_rows)
+                results = parallel(delayed(_fit_and_score)(candidate, train_features, labels[rung_index],
+                                                           test_features, labels[test_index])
+                                   for candidate in group)
+                for candidate, result in zip(group, results):
+                    timings[_candidate_key(candidate)] = timings[_classifier_key(candidate)] = \
+                        (result['fit_seconds'], n_rows)
+                    entry = {**candidate, **result, 'rung': rung, 'n_rows': n_rows}
+                    history.append(entry)
+                    scored.append(entry)
+
+            if not scored or n_rows >= n_total:
+                break
+            scored.sort(key=lambda entry: entry['f1'], reverse=True)
+            ranked = [{key: entry[key] for key in ('vectorizer', 'vectorizer_kwargs',
+                                                   'classifier', 'classifier_kwargs')}
+                      for entry in scored]
+            survivors, n_rows = _schedule(ranked, n_rows, n_total, eta, deadline - time.monotonic(),
+                                          timings, n_workers)
+            rung += 1
+
+    if not history:
+        return None, history
+    # prefer results from the largest training size reached, then the best F1
+    best = max(history, key=lambda entry: (entry['n_rows'], entry['f1']))
+    return best, history
+
+
+######################### persisted best configurations
+
+def best_config_path(data_fingerprint):
+    return os.path.join(get_cache_dir('tuning'), f'{data_fingerprint}.json')
+
+
+def save_best_config(data_fingerprint, best):
+    path = best_config_path(data_fingerprint)
+    with open(path, 'w') as f:
+        json.dump(best, f, indent=2, default=list)
+    return path
+
+
+def load_best_config(data_fingerprint):
+    path = best_config_path(data_fingerprint)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        best = json.load(f)
+    # JSON turns ngram_range tuples into lists, which sklearn rejects
+    if 'ngram_range' in best['vectorizer_kwargs']:
+        best['vectorizer_kwargs']['ngram_range'] = tuple(best['vectorizer_kwargs']['ngram_range'])
+    return best
@@ -0,0 +1,68 @@
+from functools import lru_cache, partial
+
+import numpy as np
+import pandas as pd
+
+from sentiment_analyzer.dedup import factorize_texts, scatter
+from sentiment_analyzer.parallel import map_chunks
+from sentiment_analyzer.resources import shared
+
+
+######################### batched VADER scoring
+
+def _load_vader_analyzer():
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def get_vader_analyzer():
+    # one lexicon per process, shared by every session (see resources.py)
+    return shared('vader_analyzer', _load_vader_analyzer)
+
+
+VADER_SCORE_COLUMNS = ['compound', 'pos', 'neu', 'neg']
+DEFAULT_CHUNK_SIZE = 5000
+
+
+@lru_cache(maxsize=100000)
+def _polarity_scores(txt):
+    # per-process memo on top of the per-call dedup, so repeated texts across chunks
+    # or reruns (scored by the same worker) skip the lexicon walk
+    scores = get_vader_analyzer().polarity_scores(txt)
+    return scores['compound'], scores['pos'], scores['neu'], scores['neg']
+
+
+def _score_texts(texts, memo=True):
+    # Loaded outside the loop: a missing or broken lexicon must raise, not turn every
+    # row into NaN (which the labels would then show as neutral).
+    get_vader_analyzer()
+    score = _polarity_scores if memo else _polarity_scores.__wrapped__
+    out = np.full((len(texts), len(VADER_SCORE_COLUMNS)), np.nan)
+    for i, txt in enumerate(texts):
+        try:
+            out[i] = score(txt)
+        except Exception:
+            # same contract as vader_sentiment: a text VADER cannot score is missing
+            pass
+    return out
+
+
+def score_vader(texts, n_jobs=None, chunk_size=DEFAULT_CHUNK_SIZE, memo=True):
+    # Returns a DataFrame with compound/pos/neu/neg per text (index kept for a Series).
+    # Duplicate texts are scored once; unique texts are spread across the shared worker
+    # pool, where each worker builds its SentimentIntensityAnalyzer a single time.
+    # memo=False bypasses the per-process memo in every worker (cold benchmarks).
+    index = texts.index if isinstance(texts, pd.Series) else None
+    codes, uniques = factorize_texts(texts)
+
+    parts = map_chunks(partial(_score_texts, memo=memo), uniques, n_jobs=n_jobs, chunk_size=chunk_size)
+    unique_scores = np.vstack(parts) if parts else np.empty((0, len(VADER_SCORE_COLUMNS)))
+    # missing texts (NaN/None) come out as NaN rows
+    return pd.DataFrame(scatter(unique_scores, codes), columns=VADER_SCORE_COLUMNS, index=index)
+
+
+def vader_labels(compound, neg_threshold=-0.05, pos_threshold=0.05):
+    # Vectorized vader_analysis: NaN compares false both ways and lands on 'neutral'.
+    compound = np.asarray(compound, dtype=float)
+    return np.select([compound < neg_threshold, compound > pos_threshold],
+                     ['negative', 'positive'], default='neutral')
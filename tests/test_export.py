@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sentiment_analyzer.export import open_writer
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_column_empty_in_first_chunk_and_text_later(tmp_path, fmt):
+    # read_csv gives an all-empty text column float64 dtype in that chunk
+    first = pd.DataFrame({'Review': ['a', 'b'], 'Clean Review': [np.nan, np.nan]})
+    second = pd.DataFrame({'Review': ['c', 'd'], 'Clean Review': ['good', np.nan]}, index=[2, 3])
+    path = tmp_path / f'out.{fmt}'
+
+    writer = open_writer(path, fmt)
+    writer.write(first)
+    writer.write(second)
+    writer.close()
+
+    if fmt == 'parquet':
+        result = pd.read_parquet(path)
+    else:
+        import pyarrow as pa
+        with pa.ipc.open_file(path) as reader:
+            result = reader.read_all().to_pandas()
+    assert result['Review'].tolist() == ['a', 'b', 'c', 'd']
+    assert result['Clean Review'].tolist()[2] == 'good'
+    assert result['Clean Review'].isna().tolist() == [True, True, False, True]
+    assert result.index.tolist() == [0, 1, 2, 3]
+
+
+def test_numeric_columns_keep_their_type(tmp_path):
+    path = tmp_path / 'out.parquet'
+    writer = open_writer(path)
+    writer.write(pd.DataFrame({'polarity': [0.5, -0.1]}))
+    writer.write(pd.DataFrame({'polarity': [np.nan, 0.2]}, index=[2, 3]))
+    writer.close()
+
+    result = pd.read_parquet(path)
+    assert result['polarity'].dtype == np.float64
+    assert len(result) == 4
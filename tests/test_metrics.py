@@ -0,0 +1,68 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from sentiment_analyzer.metrics import ConfusionMatrix, confusion_matrix
+
+metrics = pytest.importorskip('sklearn.metrics')
+
+CLASSES = ['positive', 'negative']
+
+
+def _labels(n, seed, classes=('positive', 'negative', 'neutral')):
+    rng = np.random.RandomState(seed)
+    weights = np.array([0.6, 0.3, 0.1][:len(classes)])
+    true = rng.choice(classes, size=n, p=weights / weights.sum())
+    predicted = np.where(rng.rand(n) < 0.8, true, rng.choice(classes, size=n))
+    return true.astype(object), predicted.astype(object)
+
+
+def _assert_matches_sklearn(matrix, true, predicted):
+    scores = matrix.scores()
+    assert scores['accuracy'] == pytest.approx(metrics.accuracy_score(true, predicted))
+    for name, func in [('precision', metrics.precision_score), ('recall', metrics.recall_score),
+                       ('f1', metrics.f1_score)]:
+        assert scores[name] == pytest.approx(func(true, predicted, average='weighted', zero_division=0))
+
+    report = matrix.report()
+    expected = metrics.classification_report(true, predicted, output_dict=True, zero_division=0)
+    for row, values in expected.items():
+        if row == 'accuracy':
+            assert report.loc[row, 'precision'] == pytest.approx(values)
+            continue
+        assert report.loc[row, 'precision'] == pytest.approx(values['precision'])
+        assert report.loc[row, 'recall'] == pytest.approx(values['recall'])
+        assert report.loc[row, 'f1-score'] == pytest.approx(values['f1-score'])
+        assert report.loc[row, 'support'] == values['support']
+
+    labels = sorted(set(true) | set(predicted))
+    expected = metrics.confusion_matrix(true, predicted, labels=labels)
+    assert (matrix.frame(labels).to_numpy() == expected).all()
+
+
+def test_incremental_updates_match_sklearn():
+    true, predicted = _labels(10000, seed=0)
+    matrix = ConfusionMatrix(CLASSES)
+    for start in range(0, len(true), 777):
+        matrix.update(true[start:start + 777], predicted[start:start + 777])
+    _assert_matches_sklearn(matrix, true, predicted)
+
+
+def test_merged_partial_matrices_match_sklearn():
+    true, predicted = _labels(9000, seed=1)
+    # partials that saw different label orders, and one that went through pickling
+    # like a pool worker's result
+    parts = [confusion_matrix(true[i::3], predicted[i::3], classes=classes)
+             for i, classes in enumerate([CLASSES, ['neutral'], None])]
+    merged = pickle.loads(pickle.dumps(parts[0]))
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.n == len(true)
+    _assert_matches_sklearn(merged, np.concatenate([true[i::3] for i in range(3)]),
+                            np.concatenate([predicted[i::3] for i in range(3)]))
+
+
+def test_two_classes_only():
+    true, predicted = _labels(5000, seed=2, classes=CLASSES)
+    _assert_matches_sklearn(confusion_matrix(true, predicted, classes=CLASSES), true, predicted)